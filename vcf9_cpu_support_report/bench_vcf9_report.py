@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness for vcf9_cpu_support_report.py.
+
+Generates synthetic Broadcom "Systems" HCL exports and VCF Operations host inventories,
+then times each pipeline stage (CSV load, HCL build, matching, HTML render) and records
+tracemalloc peaks. Results are saved as JSON so runs can be compared between versions.
+
+    python3 bench_vcf9_report.py --hcl-rows 5000 --hosts 1000 10000 100000 --out bench.json
+"""
+
+import os, sys, re, csv, json, time, random, argparse, platform, tempfile, tracemalloc, gc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import vcf9_cpu_support_report as rpt
+import vcf9_canon
+
+# =========================
+# Synthetic data
+# =========================
+HCL_COLUMNS = ["Model", "CPU Model", "Code Name", "Supported Releases"]
+INV_COLUMNS = ["Name", "Parent vCenter", "Parent Cluster", "vSphere Tag", "Version", "Model",
+               "Serial Number", "BIOS Version", "CPU Model", "Sockets", "Cores", "Memory (GB)",
+               "NIC Count", "Management IP"]
+
+# Prefixes cover every branch of vendor_from_model(), plus a few that land in "Other"
+MODEL_PREFIXES = [
+    ("Dell Inc. PowerEdge R", 3), ("Dell Inc. VxRail P", 3), ("Cisco Systems Inc UCSC-C", 3),
+    ("Cisco Systems Inc UCSX-", 3), ("HPE ProLiant DL", 3), ("Hewlett Packard Enterprise ProLiant DL", 2),
+    ("HP ProLiant BL", 2), ("Lenovo ThinkSystem SR", 3), ("VMware Virtual Platform ", 1),
+    ("Supermicro SYS-", 3), ("Fujitsu PRIMERGY RX", 3),
+]
+CPU_FAMILIES = [
+    ("Intel(R) Xeon(R) Gold {n} CPU", "Cascade Lake", 5200, 6299),
+    ("Intel(R) Xeon(R) Silver {n} CPU", "Skylake", 4100, 4199),
+    ("INTEL(R) XEON(R) GOLD {n}Y", "Emerald Rapids", 6500, 6599),
+    ("Intel® Xeon® Platinum {n} CPU", "Ice Lake", 8300, 8399),
+    ("AMD EPYC {n} 32-Core Processor", "Milan", 7003, 7763),
+]
+RELEASES = ["ESXi 8.x", "ESXi 9.0", "ESXi 7.0 U3; ESXi 8.0 U2; ESXi 9.0", "ESXi 8.0 U3", "ESXi 7.0 U3"]
+DELIMITERS = [",", ";", "\t", "|"]
+ENCODINGS = ["utf-8", "utf-8-sig", "cp1252"]
+
+def _model(rng):
+    prefix, width = rng.choice(MODEL_PREFIXES)
+    return f"{prefix}{rng.randint(10 ** (width - 1), 10 ** width - 1)}"
+
+def _cpu(rng):
+    fmt, code, lo, hi = rng.choice(CPU_FAMILIES)
+    return fmt.format(n=rng.randint(lo, hi)), code
+
+def _ghz(rng):
+    return f" @ {rng.randint(18, 38) / 10:.2f}GHz"
+
+def generate_hcl(path, rows, rng, delimiter=",", encoding="utf-8"):
+    """Write a Systems*.csv style export. Returns the (model, cpu) pairs it contains."""
+    models = [_model(rng) for _ in range(max(1, rows // 8))]
+    pairs = []
+    with open(path, "w", encoding=encoding, errors="replace", newline="") as f:
+        w = csv.writer(f, delimiter=delimiter)
+        w.writerow(HCL_COLUMNS)
+        for _ in range(rows):
+            model = rng.choice(models); cpu, code = _cpu(rng)
+            if rng.random() < 0.5: cpu += _ghz(rng)
+            w.writerow([model, cpu, code, rng.choice(RELEASES)])
+            pairs.append((model, cpu))
+    return pairs
+
+def generate_inventory(path, hosts, pairs, rng, delimiter=",", encoding="utf-8-sig"):
+    """
+    Write a VCF Operations host inventory. Most hosts use an HCL pair verbatim (plus a GHz
+    suffix), some drift enough to need the relaxed match and some are not listed at all.
+    """
+    # Real estates reuse a few hundred configurations, so draw hosts from a limited pool.
+    # Operations reports the CPU with its clock speed; the HCL row may or may not have it.
+    pool = []
+    for model, cpu in (rng.choice(pairs) for _ in range(min(len(pairs), 400))):
+        base = cpu.split(" @ ")[0]
+        x = rng.random()
+        if x < 0.10: base = base.rsplit(" ", 1)[0]        # truncated -> relaxed match
+        elif x < 0.15: model = _model(rng)                # not in the HCL
+        pool.append((model, base + _ghz(rng)))
+    with open(path, "w", encoding=encoding, errors="replace", newline="") as f:
+        w = csv.writer(f, delimiter=delimiter)
+        w.writerow(INV_COLUMNS)
+        for i in range(hosts):
+            model, cpu = rng.choice(pool)
+            vc = i % 12
+            w.writerow([f"esx{i:06d}.dc{vc}.example.local", f"vcsa{vc:02d}.example.local", f"cl{vc:02d}-{i % 9}",
+                        "", "8.0.3-24674464", model, f"SN{i:08X}", "2.21.2", cpu, rng.choice([1, 2, 2, 4]),
+                        rng.choice([16, 24, 32, 48, 64, 96]), f"{rng.choice([256, 512, 768, 1024, 2048]) - rng.random():.2f}",
+                        rng.choice([2, 4, 6, 8]), f"10.{vc}.{i // 250 % 250}.{i % 250 + 1}"])
+
+# =========================
+# Stage timing
+# =========================
+def measure(fn, memory=True):
+    """Run fn() once for wall time and, if requested, once more under tracemalloc for its peak."""
+    gc.collect()
+    t0 = time.perf_counter(); result = fn(); elapsed = time.perf_counter() - t0
+    peak = None
+    if memory:
+        del result; gc.collect()
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {"seconds": round(elapsed, 6), "peak_bytes": peak}
+
+def build_hcl_with_indexes(hcl_path):
+    """build_hcl_dataset() plus its lazily built indexes, so build_hcl stays comparable across versions."""
+    hcl = rpt.build_hcl_dataset(hcl_path)
+    hcl["relaxed_index"]; hcl["suggest_index"]
+    return hcl
+
+def check_relaxed_index(hcl, pairs, rng, queries=2000):
+    """Compare relaxed_lookup() with relaxed_scan() (the original linear loop) on random queries."""
+    lookup, index = hcl["lookup"], hcl["relaxed_index"]
+    keys = list(lookup)
+    for _ in range(queries):
+        nm, nc = rng.choice(keys) if keys else ("", "")
+        nc = nc[:rng.randint(0, len(nc))] if rng.random() < 0.5 else nc + rng.choice(["", " cpu", "x"])
+        if rng.random() < 0.1: nm = rpt.norm_model(_model(rng))
+        if rpt.relaxed_lookup(index, nm, nc) is not rpt.relaxed_scan(lookup, nm, nc):
+            raise AssertionError(f"relaxed index mismatch for {(nm, nc)!r}")
+    return queries
+
+def check_suggest_index(hcl, rng, queries=200):
+    """Compare the top suggestion with a linear scan scoring every HCL key (or, when even the
+    rarest query token is over the candidate cap, the truncated posting list suggest_entries scores)."""
+    index = hcl["suggest_index"]
+    idf, tokens, weights, keys = index["idf"], index["tokens"], index["weights"], list(hcl["lookup"])
+    postings, cap = index["postings"], rpt.SUGGEST_MAX_CANDIDATES
+    for _ in range(queries):
+        nm, nc = rng.choice(keys) if keys else ("", "")
+        nm = rng.choice(["", "unknown ", "vendor inc. "]) + nm
+        nc = nc[:rng.randint(len(nc) // 2, len(nc))]
+        got = rpt.suggest_entries(index, nm, nc, k=1)
+        q = {t for t in rpt.suggest_tokens(nm, nc) if t in idf}
+        qw, best = sum(idf[t] for t in q), None
+        rarest = postings[min(q, key=lambda t: (len(postings[t]), t))] if q else ()
+        scan = rarest[:cap] if len(rarest) > cap else range(len(tokens))
+        for pos in scan:
+            toks = tokens[pos]
+            shared = sum(idf[t] for t in q & toks)
+            score = round(shared / (qw + weights[pos] - shared), 9) if q else 0
+            if score >= rpt.SUGGEST_MIN_SCORE and (best is None or score > best[0]): best = (score, pos)
+        if (got[0][1] if got else None) is not (index["entries"][best[1]] if best else None):
+            raise AssertionError(f"suggest index mismatch for {(nm, nc)!r}")
+    return queries
+
+# Capacity cells as Operations and hand-edited exports write them -> parse_number() result
+PARSE_NUMBER_CASES = [("766.63", 766.63), ("766,63", 766.63), ("1,024", 1024.0), ("1,024.5", 1024.5),
+                      ("1.024,5", 1024.5), ("1.234.567,89", 1234567.89), (" 64 ", 64.0), ("", 0.0),
+                      ("-2", 0.0), ("n/a", 0.0), ("inf", 0.0)]
+
+def check_parse_number():
+    for raw, expected in PARSE_NUMBER_CASES:
+        if rpt.parse_number(raw) != expected:
+            raise AssertionError(f"parse_number({raw!r}) = {rpt.parse_number(raw)!r}, expected {expected!r}")
+    return len(PARSE_NUMBER_CASES)
+
+# =========================
+# Canonicalisation
+# =========================
+# The report's normalisers as they were before vcf9_canon (no memoisation, patterns looked
+# up on every call). They are the baseline for timing and the reference the canonical keys must equal.
+def legacy_norm_cpu(s):
+    if not s: return ""
+    x = s.replace("®","").replace("(R)","").replace("(r)","")
+    x = re.sub(r"@\s*[\d\.]+\s*ghz", "", x, flags=re.I)
+    return re.sub(r"\s+"," ", x).strip().lower()
+
+def legacy_norm_model(s):
+    if not s: return ""
+    return re.sub(r"\s+"," ", s).strip().lower()
+
+def legacy_vendor_from_model(model):
+    if not model: return "Other"
+    m = model.lower()
+    if m.startswith("dell") or "vxrail" in m: return "Dell"
+    if m.startswith("cisco"): return "Cisco"
+    if m.startswith("hpe") or m.startswith("hewlett") or m.startswith("hp "): return "HPE / HP"
+    if m.startswith("lenovo"): return "Lenovo"
+    if m.startswith("vmware"): return "VMware"
+    return "Other"
+
+def legacy_normalise_key(k):
+    if k is None: return ""
+    k = str(k).replace("\ufeff", "")
+    k = re.sub(r"\s+", " ", k).strip()
+    return k.lower().replace(" ", "_")
+
+CANON_EDGE_CASES = ["", " ", "\ufeffModel ", "Intel(R)  Xeon(r) Gold 6248 CPU @ 2.50GHz", "INTEL® XEON® @2GHZ",
+                    "(®R) x", "a\u00a0\u2003b\tc\n", "@ 2.(R)70GHz", "HP ProLiant", "hpe", "VxRail E560", "Memory (GB)"]
+
+def _normalise_all(pairs, norm_model, norm_cpu, vendor):
+    for model, cpu in pairs:
+        norm_model(model); norm_cpu(cpu); vendor(model)
+
+def bench_canon(pairs, check=False):
+    """Time the legacy and vcf9_canon normalisers over the HCL (model, CPU) rows, with a cold cache."""
+    if check:
+        for model, cpu in list(pairs) + [(s, s) for s in CANON_EDGE_CASES]:
+            if (vcf9_canon.norm_model(model), vcf9_canon.norm_cpu(cpu), vcf9_canon.vendor_from_model(model),
+                    vcf9_canon.normalise_key(cpu)) != (legacy_norm_model(model), legacy_norm_cpu(cpu),
+                                                       legacy_vendor_from_model(model), legacy_normalise_key(cpu)):
+                raise AssertionError(f"canonical key mismatch for {(model, cpu)!r}")
+    t0 = time.perf_counter(); _normalise_all(pairs, legacy_norm_model, legacy_norm_cpu, legacy_vendor_from_model)
+    legacy = time.perf_counter() - t0
+    vcf9_canon.clear_caches()
+    t0 = time.perf_counter(); _normalise_all(pairs, vcf9_canon.norm_model, vcf9_canon.norm_cpu, vcf9_canon.vendor_from_model)
+    canon = time.perf_counter() - t0
+    stats = vcf9_canon.cache_stats()
+    return {"rows": len(pairs), "legacy_seconds": round(legacy, 6), "canon_seconds": round(canon, 6),
+            "speedup": round(legacy / canon, 2) if canon else None,
+            "hit_rate": {k: stats[k]["hit_rate"] for k in ("norm_model", "norm_cpu", "vendor_from_model")},
+            "checked": check}
+
+def run_case(workdir, hcl_rows, hosts, rng, memory=True, check=False, mixed=False):
+    delim_h, enc_h = (rng.choice(DELIMITERS), rng.choice(ENCODINGS)) if mixed else (",", "utf-8")
+    delim_i, enc_i = (rng.choice(DELIMITERS), rng.choice(ENCODINGS)) if mixed else (",", "utf-8-sig")
+    hcl_path = os.path.join(workdir, f"Systems_{hcl_rows}.csv")
+    inv_path = os.path.join(workdir, f"Bench {hosts} Host Inventory.csv")
+    out_path = os.path.join(workdir, f"bench_{hcl_rows}_{hosts}.html")
+
+    case = {"hcl_rows": hcl_rows, "hosts": hosts,
+            "hcl_format": {"delimiter": delim_h, "encoding": enc_h},
+            "inventory_format": {"delimiter": delim_i, "encoding": enc_i}, "stages": {}}
+    stages = case["stages"]
+
+    t0 = time.perf_counter()
+    pairs = generate_hcl(hcl_path, hcl_rows, rng, delim_h, enc_h)
+    generate_inventory(inv_path, hosts, pairs, rng, delim_i, enc_i)
+    stages["generate"] = {"seconds": round(time.perf_counter() - t0, 6), "peak_bytes": None}
+    case["bytes"] = {"hcl": os.path.getsize(hcl_path), "inventory": os.path.getsize(inv_path)}
+    case["canon"] = bench_canon(pairs, check)
+
+    _, stages["load_csv_inventory"] = measure(lambda: sum(1 for _ in rpt.stream_csv_robust(inv_path)[0]), memory)
+    hcl, stages["build_hcl"] = measure(lambda: build_hcl_with_indexes(hcl_path), memory)
+    m, stages["match"] = measure(lambda: rpt.match_inventory(hcl, inv_path), memory)
+    _, stages["render_html"] = measure(
+        lambda: rpt.write_report(out_path, hcl["enriched"], m["appendix"], m["configs"], capacity=m["capacity"]), memory)
+    case["html_bytes"] = os.path.getsize(out_path)
+    case["distinct_configs"] = len(m["configs"])
+    case["match_types"] = {t: sum(c.hosts for c in m["configs"] if c.match == t) for t in ("exact", "relaxed", "unmatched")}
+    case["suggested_pairs"] = sum(1 for c in m["configs"] if c.suggestions)
+    if check:
+        case["relaxed_index_checks"] = check_relaxed_index(hcl, pairs, rng)
+        case["suggest_index_checks"] = check_suggest_index(hcl, rng)
+        case["parse_number_checks"] = check_parse_number()
+    return case
+
+# =========================
+# Main
+# =========================
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark vcf9_cpu_support_report.py on synthetic data.")
+    ap.add_argument("--hcl-rows", type=int, nargs="+", default=[5000], help="HCL export sizes (rows)")
+    ap.add_argument("--hosts", type=int, nargs="+", default=[1000, 10000, 100000], help="inventory sizes (hosts)")
+    ap.add_argument("--seed", type=int, default=9)
+    ap.add_argument("--mixed", action="store_true", help="pick a random delimiter and encoding for every file")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (halves run time)")
+    ap.add_argument("--check", action="store_true", help="also verify the relaxed and suggestion indexes against a linear scan, and canonical keys against the old normalisers, and capacity number parsing")
+    ap.add_argument("--data-dir", help="keep generated CSV/HTML here instead of a temporary folder")
+    ap.add_argument("--out", default=f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", help="results JSON")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rpt.DEBUG = False
+    rpt.HEADER_IMG = ""
+    rng = random.Random(args.seed)
+    results = {"generated": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+               "platform": platform.platform(), "seed": args.seed, "cases": []}
+
+    tmp = None if args.data_dir else tempfile.TemporaryDirectory(prefix="vcf9_bench_")
+    workdir = args.data_dir or tmp.name
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        for hcl_rows in args.hcl_rows:
+            for hosts in args.hosts:
+                case = run_case(workdir, hcl_rows, hosts, rng, memory=not args.no_memory,
+                                check=args.check, mixed=args.mixed)
+                results["cases"].append(case)
+                st = case["stages"]
+                print(f"[BENCH] hcl={hcl_rows:>8} hosts={hosts:>8}  " + "  ".join(
+                    f"{k}={v['seconds']:.3f}s" + (f"/{v['peak_bytes'] / 2**20:.1f}MiB" if v["peak_bytes"] else "")
+                    for k, v in st.items()) + f"  canon={case['canon']['speedup']}x")
+    finally:
+        if tmp: tmp.cleanup()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print("Benchmark results written to:\n ", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Canonical keys for HCL and inventory strings, used by vcf9_cpu_support_report.py.
+
+norm_cpu, norm_model, vendor_from_model and normalise_key return exactly what the report
+has always used, so exact and relaxed matching keys do not move. cpu_key is a looser CPU
+key that also drops vendor noise ("CPU", "Processor", "(TM)", "Intel(R)" casing), for
+fuzzy comparisons such as the nearest-entry suggestions.
+
+Exports repeat the same few thousand model and CPU strings, so every function is memoised
+in a bounded LRU cache (CANON_CACHE_SIZE entries, least recently used evicted first).
+cache_stats() reports hits, misses and hit rate per function:
+
+    python3 vcf9_canon.py "HCL_DIR/Systems.csv" "Sep 2025 Host Inventory.csv"
+"""
+
+import os, re, sys
+from functools import lru_cache
+
+CANON_CACHE_SIZE = 1 << 16
+
+GHZ_RE = re.compile(r"@\s*[\d\.]+\s*ghz", re.I)
+CPU_NOISE_RE = re.compile(r"\(tm\)|™|\b(?:cpu|processor)\b")
+
+@lru_cache(maxsize=CANON_CACHE_SIZE)
+def norm_cpu(s: str) -> str:
+    if not s: return ""
+    x = s.replace("®","").replace("(R)","").replace("(r)","")
+    return " ".join(GHZ_RE.sub("", x).split()).lower()
+
+@lru_cache(maxsize=CANON_CACHE_SIZE)
+def norm_model(s: str) -> str:
+    if not s: return ""
+    return " ".join(s.split()).lower()
+
+@lru_cache(maxsize=CANON_CACHE_SIZE)
+def cpu_key(s: str) -> str:
+    """norm_cpu without "cpu", "processor" and trademark marks: "INTEL(R) XEON(R) GOLD 6248 CPU" -> "intel xeon gold 6248"."""
+    return " ".join(CPU_NOISE_RE.sub(" ", norm_cpu(s)).split())
+
+@lru_cache(maxsize=CANON_CACHE_SIZE)
+def vendor_from_model(model: str) -> str:
+    if not model: return "Other"
+    m = model.lower()
+    if m.startswith("dell") or "vxrail" in m: return "Dell"
+    if m.startswith("cisco"): return "Cisco"
+    if m.startswith("hpe") or m.startswith("hewlett") or m.startswith("hp "): return "HPE / HP"
+    if m.startswith("lenovo"): return "Lenovo"
+    if m.startswith("vmware"): return "VMware"
+    return "Other"
+
+@lru_cache(maxsize=CANON_CACHE_SIZE)
+def _normalise_key(k: str) -> str:
+    return " ".join(k.replace("\ufeff", "").split()).lower().replace(" ", "_")
+
+def normalise_key(k) -> str:
+    """CSV header -> lower_snake key ("Memory (GB)" -> "memory_(gb)")."""
+    if k is None: return ""
+    return _normalise_key(str(k))
+
+CACHED = {"norm_cpu": norm_cpu, "norm_model": norm_model, "cpu_key": cpu_key,
+          "vendor_from_model": vendor_from_model, "normalise_key": _normalise_key}
+
+def cache_stats():
+    """{name: {"hits", "misses", "size", "maxsize", "hit_rate"}} for every memoised function."""
+    stats = {}
+    for name, fn in CACHED.items():
+        info = fn.cache_info()
+        calls = info.hits + info.misses
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize,
+                       "hit_rate": round(info.hits / calls, 4) if calls else None}
+    return stats
+
+def clear_caches():
+    for fn in CACHED.values(): fn.cache_clear()
+
+def main(argv=None):
+    """Normalise the model/CPU columns of the given CSVs and print the cache statistics."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import vcf9_cpu_support_report as rpt
+    import vcf9_canon as canon      # the instance the report uses, not this __main__ copy
+    rpt.DEBUG = False
+    for path in (argv if argv is not None else sys.argv[1:]):
+        rows, headers = rpt.stream_csv_robust(path)
+        if rows is None: print("[WARN] Could not parse", path); continue
+        model_col = rpt.pick_column(headers, ["Model","Server Model","Product","Model Name"])
+        cpu_col = rpt.pick_column(headers, ["CPU Model","CPU","Processor"])
+        n = 0
+        for r in rows:
+            model, cpu = r.get(model_col, ""), r.get(cpu_col, "")
+            canon.norm_model(model); canon.vendor_from_model(model); canon.norm_cpu(cpu); canon.cpu_key(cpu); n += 1
+        print(f"[CANON] {path}: {n} rows")
+    for name, st in canon.cache_stats().items():
+        rate = "-" if st["hit_rate"] is None else f"{st['hit_rate'] * 100:.1f}%"
+        print(f"  {name:<18} hits={st['hits']:<9} misses={st['misses']:<9} size={st['size']:<7} hit rate {rate}")
+
+if __name__ == "__main__":
+    main()
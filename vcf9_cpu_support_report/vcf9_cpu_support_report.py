@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, sys, csv, io, re, base64, mimetypes
-from math import cos, sin, pi
+import os, sys, csv, io, re, base64, gzip, mimetypes, codecs, hashlib, pickle, argparse, json, time, tracemalloc, threading, fnmatch, heapq
+from contextlib import contextmanager, nullcontext, ExitStack
+from math import cos, sin, pi, log, isfinite
+from array import array
 from datetime import datetime
+from urllib.parse import urlsplit, unquote
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from vcf9_canon import norm_cpu, norm_model, cpu_key, vendor_from_model, normalise_key, cache_stats
 
 # =========================
 # Configuration
@@ -17,17 +24,85 @@ OUT_HTML   = os.path.join(BASE_DIR, f"vcf9_cpu_support_report_{datetime.now().st
 # Inventory search (e.g., “Sep 2025 Host Inventory.csv” or similar)
 INV_SEARCH_DIRS = [BASE_DIR]
 
+# Compiled HCL indexes are cached here (see --no-cache / --purge-cache)
+CACHE_DIR = os.path.join(BASE_DIR, ".vcf9_cache")
+
+# Status is always evaluated for ESXi 9.0. Extra release targets (e.g. "ESXi 8.0 U3") add
+# per-target OK/Blocked columns and a summary table (see also --targets)
+EXTRA_RELEASE_TARGETS = []
+
 DEBUG = True
 
+# =========================
+# Instrumentation
+# =========================
+# Enabled with --profile. While PROFILE is None, stage() hands back a no-op context with a
+# fresh throwaway record and count() returns immediately, so an unprofiled run pays
+# almost nothing per stage and callers never share state through the record.
+PROFILE = None
+
+class Profiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages, self.counters, self._stack = [], {}, []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **info):
+        rec = {"stage": name, "depth": len(self._stack), **info}
+        self.stages.append(rec)
+        self._stack.append(rec)
+        if self.memory:
+            if hasattr(tracemalloc, "reset_peak"): tracemalloc.reset_peak()
+            elif len(self._stack) == 1:
+                # Python 3.8 has no reset_peak: restart tracing around each top-level stage;
+                # nested stages then report the peak since their top-level stage began
+                tracemalloc.stop(); tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = round(time.perf_counter() - t0, 6)
+            self._stack.pop()
+            if self.memory:
+                # nested stages reset the peak, so fold their peaks back into the parent
+                rec["peak_bytes"] = max(tracemalloc.get_traced_memory()[1], rec.pop("_child_peak", 0))
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent["_child_peak"] = max(parent.get("_child_peak", 0), rec["peak_bytes"])
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing(): tracemalloc.start()
+
+    def report(self):
+        return {"generated": datetime.now().isoformat(timespec="seconds"),
+                "total_seconds": round(time.perf_counter() - self.started, 6),
+                "tracemalloc": self.memory, "stages": self.stages, "counters": self.counters,
+                "canon_caches": cache_stats()}
+
+def stage(name, **info):
+    # a fresh record per call when profiling is off, so callers never share state
+    return PROFILE.stage(name, **info) if PROFILE is not None else nullcontext({})
+
+def count(key, n=1):
+    if PROFILE is not None: PROFILE.count(key, n)
+
 # =========================
 # File discovery
 # =========================
+def is_hcl_filename(fname):
+    """Systems*.csv (tolerates spaces)."""
+    low = fname.lower().replace(" ", "")
+    return low.startswith("systems") and low.endswith(".csv")
+
 def find_hcl_file():
     """Find Systems*.csv in the HCL_DIR (tolerates spaces)."""
     try:
         for fname in sorted(os.listdir(HCL_DIR)):
-            low = fname.lower().replace(" ", "")
-            if low.startswith("systems") and low.endswith(".csv"):
+            if is_hcl_filename(fname):
                 path = os.path.join(HCL_DIR, fname)
                 if DEBUG: print("[HCL] Using:", path)
                 return path
@@ -35,13 +110,21 @@ def find_hcl_file():
         pass
     return None
 
+def is_inventory_filename(fname):
+    """Host Inventory CSV name (accepts 'inventory' or common typo 'invenotry')."""
+    low = fname.lower().replace(" ", "")
+    return fname.lower().endswith(".csv") and ("host" in low) and ("inventory" in low or "invenotry" in low)
+
+def is_ops_url(path):
+    """Inventories given as http(s) URLs are fetched from VCF Operations (vcf9_ops_collector.py)."""
+    return isinstance(path, str) and path.lower().startswith(("http://", "https://"))
+
 def find_inventory_file():
     """Find a Host Inventory CSV (accepts 'inventory' or common typo 'invenotry')."""
     for folder in INV_SEARCH_DIRS:
         try:
             for fname in sorted(os.listdir(folder)):
-                low = fname.lower().replace(" ", "")
-                if fname.lower().endswith(".csv") and ("host" in low) and ("inventory" in low or "invenotry" in low):
+                if is_inventory_filename(fname):
                     path = os.path.join(folder, fname)
                     if DEBUG: print("[INV] Using:", path)
                     return path
@@ -49,70 +132,191 @@ def find_inventory_file():
             continue
     return None
 
+# =========================
+# Recursive discovery
+# =========================
+# --discover walks whole directory trees (e.g. NFS/SMB customer shares) for Systems*.csv and
+# Host Inventory CSVs. Each directory is listed with os.scandir by a thread pool, so slow
+# network round-trips overlap; only matching files are stat-ed, once, and the result is a
+# manifest that --batch can read back. Symlinked directories are not followed.
+DISCOVERY_WORKERS = 16
+MANIFEST_VERSION = 1
+
+def input_kind(fname):
+    if is_hcl_filename(fname): return "hcl"
+    if is_inventory_filename(fname): return "inventory"
+    return None
+
+def _glob_hit(rel, patterns):
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(rel.rsplit("/", 1)[-1], p) for p in patterns)
+
+def _scan_dir(path, rel, exclude):
+    """One directory: ([(kind, path, rel, stat)], [(subdir path, subdir rel)])."""
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                r = f"{rel}/{e.name}" if rel else e.name
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        if not _glob_hit(r + "/", exclude) and not _glob_hit(r, exclude): dirs.append((e.path, r))
+                        continue
+                    kind = input_kind(e.name)
+                    if kind and not _glob_hit(r, exclude) and e.is_file():
+                        files.append((kind, e.path, r, e.stat()))
+                except OSError:
+                    continue
+    except OSError as err:
+        if DEBUG: print("[DISCOVER] Skipping", path, "-", err)
+    return files, dirs
+
+def discover_inputs(roots, include=(), exclude=(), workers=DISCOVERY_WORKERS):
+    """
+    All HCL and inventory CSVs under roots, as [{"kind", "path", "size", "mtime_ns"}] sorted by
+    kind and path. include/exclude are fnmatch globs tried against the path relative to its
+    root and against the bare name; excluded directories are not descended into.
+    """
+    found, n_dirs = [], 0
+    with stage("discover", roots=len(roots)) as rec:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(_scan_dir, os.path.abspath(r), "", exclude) for r in roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    files, dirs = fut.result()
+                    n_dirs += 1
+                    found.extend(f for f in files if not include or _glob_hit(f[2], include))
+                    pending |= {pool.submit(_scan_dir, p, r, exclude) for p, r in dirs}
+        rec.update(dirs=n_dirs, files=len(found))
+    if DEBUG: print(f"[DISCOVER] {len(found)} input file(s) in {n_dirs} folder(s)")
+    return sorted(({"kind": k, "path": os.path.abspath(p), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                   for k, p, _, st in found), key=lambda f: (f["kind"], f["path"]))
+
+def pick_inputs(found, kind, pick="newest"):
+    """'all' matches of a kind (path order) or just the 'newest' by mtime."""
+    items = [f for f in found if f["kind"] == kind]
+    if pick == "all" or not items: return items
+    return [max(items, key=lambda f: (f["mtime_ns"], f["path"]))]
+
+def write_manifest(path, found, roots, include=(), exclude=()):
+    manifest = {"version": MANIFEST_VERSION, "generated": datetime.now().isoformat(timespec="seconds"),
+                "roots": [os.path.abspath(r) for r in roots], "include": list(include), "exclude": list(exclude),
+                "inputs": [dict(f, modified=datetime.fromtimestamp(f["mtime_ns"] / 1e9).isoformat(timespec="seconds"))
+                           for f in found]}
+    with open(path, "w", encoding="utf-8") as f: json.dump(manifest, f, indent=2)
+
+def read_manifest(path):
+    """Discovery manifest -> its input entries, or None if path is not one."""
+    try:
+        with open(path, "r", encoding="utf-8") as f: manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION: return None
+    return manifest.get("inputs", [])
+
 # =========================
 # Robust CSV loading
 # =========================
-def read_text_bytes(path):
-    with open(path, "rb") as f: return f.read()
+# Encoding and delimiter are detected from a bounded prefix; the rest of the file is
+# decoded incrementally and rows are yielded one at a time, so memory stays flat.
+CSV_SAMPLE_BYTES = 64 * 1024
+CSV_ENCODINGS = ("utf-8-sig", "utf-8", "cp1252", "latin-1")
 
-def decode_text_safely(raw_bytes):
-    for enc in ("utf-8-sig", "utf-8", "cp1252", "latin-1"):
-        try: return raw_bytes.decode(enc)
-        except UnicodeDecodeError: continue
-    return raw_bytes.decode("utf-8", errors="replace")
+def _legacy_bytes_fallback(exc):
+    """Decode error handler: bytes the sampled encoding rejects are read as cp1252/latin-1."""
+    if not isinstance(exc, UnicodeDecodeError): raise exc
+    bad = exc.object[exc.start:exc.end]
+    try: return bad.decode("cp1252"), exc.end
+    except UnicodeDecodeError: return bad.decode("latin-1"), exc.end
+
+codecs.register_error("vcf9_legacy", _legacy_bytes_fallback)
 
-def normalise_key(k: str) -> str:
-    if k is None: return ""
-    k = str(k).replace("\ufeff", "")
-    k = re.sub(r"\s+", " ", k).strip()
-    return k.lower().replace(" ", "_")
+def detect_encoding(sample: bytes) -> str:
+    for enc in CSV_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError: continue
+    return "latin-1"
 
 def coerce_cell(v):
     if v is None: return ""
     if isinstance(v, list): return " | ".join(coerce_cell(x) for x in v)
     return str(v).strip()
 
-def try_parse_with_delim(text, delim):
-    f = io.StringIO(text, newline="")
-    reader = csv.DictReader(f, delimiter=delim)
-    rows = [dict(r) for r in reader]
-    if not rows or len(rows[0].keys()) <= 1: return None, None
-    valid_headers = [h for h in rows[0].keys() if h and str(h).strip()]
-    norm_map = {h: normalise_key(h) for h in valid_headers}
-    norm_headers = [norm_map[h] for h in valid_headers]
-    norm_rows = []
-    for r in rows:
-        nr = {}
-        for h, v in r.items():
-            if h in norm_map: nr[norm_map[h]] = coerce_cell(v)
-        norm_rows.append(nr)
-    return norm_rows, norm_headers
+def _delim_works(sample_text, delim):
+    """True if DictReader with this delimiter would give a first data row with >1 keys."""
+    reader = csv.reader(io.StringIO(sample_text, newline=""), delimiter=delim)
+    header = next(reader, None)
+    if header is None: return False
+    first = next((r for r in reader if r), None)
+    if first is None: return False
+    return len(set(header)) + (1 if len(first) > len(header) else 0) > 1
 
-def load_csv_robust(path):
-    if not os.path.isfile(path): return [], []
-    text = decode_text_safely(read_text_bytes(path))
-    if not text: return [], []
-    first_line = text.splitlines()[0] if text.splitlines() else ""
+def sniff_delimiter(sample_text):
+    lines = sample_text.splitlines()
+    first_line = lines[0] if lines else ""
     prefer_pipe = ("|" in first_line and first_line.count("|") >= 1)
     delimiters = ["|", ",", ";", "\t"] if prefer_pipe else [",", ";", "\t", "|"]
     for d in delimiters:
-        rows, headers = try_parse_with_delim(text, d)
-        if rows:
-            if DEBUG: print(f"[CSV] Using delimiter '{d}' for {os.path.basename(path)}")
-            return rows, headers
-    if "|" in first_line:
-        rows, headers = try_parse_with_delim(text, "|")
-        if rows: return rows, headers
-    return [], []
+        if _delim_works(sample_text, d): return d
+    return None
+
+def _iter_csv_rows(path, encoding, delim, norm_map):
+    with open(path, "r", encoding=encoding, errors="vcf9_legacy", newline="") as f:
+        for r in csv.DictReader(f, delimiter=delim):
+            nr = {}
+            for h, v in r.items():
+                if h in norm_map: nr[norm_map[h]] = coerce_cell(v)
+            yield nr
+
+def stream_csv_robust(path):
+    """
+    Returns (rows, headers) where rows is a lazy iterator of normalised dicts,
+    or (None, []) if the file is missing or no delimiter yields a usable table.
+    """
+    if not os.path.isfile(path): return None, []
+    with stage("csv_sniff", file=os.path.basename(path)) as rec:
+        with open(path, "rb") as f: sample = f.read(CSV_SAMPLE_BYTES)
+        if not sample: return None, []
+        enc = detect_encoding(sample)
+        text = codecs.getincrementaldecoder(enc)(errors="vcf9_legacy").decode(sample, final=False)
+        delim = sniff_delimiter(text)
+        rec.update(encoding=enc, delimiter=delim, sample_bytes=len(sample))
+    if not delim: return None, []
+    if DEBUG: print(f"[CSV] Using delimiter '{delim}' ({enc}) for {os.path.basename(path)}")
+    header = next(csv.reader(io.StringIO(text, newline=""), delimiter=delim))
+    valid_headers = [h for h in dict.fromkeys(header) if h and str(h).strip()]
+    norm_map = {h: normalise_key(h) for h in valid_headers}
+    norm_headers = [norm_map[h] for h in valid_headers]
+    return _iter_csv_rows(path, enc, delim, norm_map), norm_headers
+
+def load_csv_robust(path):
+    rows, headers = stream_csv_robust(path)
+    if rows is None: return [], []
+    return list(rows), headers
+
+def stream_ops_inventory(url):
+    """Same (rows, headers) shape as stream_csv_robust, with hosts paged in from a VCF Operations API."""
+    import vcf9_ops_collector as ops
+    norm_map = {h: normalise_key(h) for h in ops.OPS_HEADERS}
+    def rows():
+        stats = {}
+        with stage("ops_fetch", url=url) as rec:
+            try:
+                for r in ops.iter_ops_hosts(url, stats=stats):
+                    yield {norm_map[h]: coerce_cell(v) for h, v in r.items()}
+            finally:
+                rec.update(stats)
+        if DEBUG: print(f"[OPS] {url}: {stats['requests']} requests, {stats['retried']} retried, {stats['connections']} connections")
+    return rows(), [norm_map[h] for h in ops.OPS_HEADERS]
 
 def pick_column(headers, candidates):
-    hset = set(headers)
-    for cand in candidates:
-        c = normalise_key(cand)
+    hset, cands = set(headers), [normalise_key(c) for c in candidates]
+    for c in cands:
         if c in hset: return c
     for h in headers:
-        for cand in candidates:
-            c = normalise_key(cand)
+        for c in cands:
             if h == c or h.startswith(c) or c in h: return h
     return None
 
@@ -123,34 +327,401 @@ def classify_support(release_str: str) -> str:
     """
     OK if 'ESXi 9.0' appears. Otherwise treat as Blocked (8.x-only, deprecated, not listed, unknown).
     """
-    if not release_str: return "Blocked"
-    t = release_str.replace("\u00A0", " ").lower().strip()
-    if "esxi 9.0" in t: return "OK"
-    # Everything else treated as blocked for upgrade readiness (planning perspective)
-    return "Blocked"
+    return classify_versions(parse_releases(release_str))
+
+def classify_versions(versions) -> str:
+    # Everything without an ESXi 9.0 listing is treated as blocked for upgrade readiness (planning perspective)
+    return "OK" if release_matches(versions, PRIMARY_TARGET[1]) else "Blocked"
+
+# =========================
+# Release matrix
+# =========================
+# "Supported Releases" is parsed once per distinct string into a frozenset of
+# (major, minor, update) versions; "ESXi 8.0 U3" and "ESXi 8.0.3" both give (8, "0", 3) and
+# "ESXi 9.0" gives (9, "0", None). A target without an update matches any update of its
+# release, so "ESXi 9.0" is met by "ESXi 9.0 U1"; "ESXi 8.x" only matches a target "ESXi 8.x".
+# Minor versions are one digit, which keeps the ESXi 9.0 test identical to the old substring check.
+RELEASE_RE = re.compile(r"esxi (\d+)\.(\d|x)(?:\.(\d+))?(?: ?(?:update|u) ?(\d+))?")
+
+def parse_releases(release_str):
+    if not release_str: return frozenset()
+    t = release_str.replace("\u00A0", " ").lower()
+    return frozenset((int(ma), mi, int(up or pa) if (up or pa) else None) for ma, mi, pa, up in RELEASE_RE.findall(t))
+
+def parse_target(label):
+    """'ESXi 8.0 U3' -> (label, (8, '0', 3)); None when the label is not an ESXi release."""
+    versions = parse_releases(label.strip())
+    return (label.strip(), next(iter(versions))) if len(versions) == 1 else None
+
+def release_matches(versions, target):
+    ma, mi, up = target
+    return any(v[0] == ma and v[1] == mi and (up is None or v[2] == up) for v in versions)
+
+PRIMARY_TARGET = parse_target("ESXi 9.0")
+
+def release_targets():
+    """Primary target first, then EXTRA_RELEASE_TARGETS (unparseable or duplicate labels are skipped)."""
+    targets, seen = [PRIMARY_TARGET], {PRIMARY_TARGET[1]}
+    for label in EXTRA_RELEASE_TARGETS:
+        t = parse_target(label)
+        if t is None:
+            print("[WARN] Ignoring release target", repr(label)); continue
+        if t[1] not in seen: seen.add(t[1]); targets.append(t)
+    return targets
+
+def target_flags(versions, targets, memo):
+    """Tuple of per-target matches, computed once per distinct version set."""
+    flags = memo.get(versions)
+    if flags is None:
+        flags = memo[versions] = tuple(release_matches(versions, t) for _, t in targets)
+    return flags
+
+# =========================
+# Relaxed match index
+# =========================
+# The relaxed rule is: first (model, cpu) key of hcl_lookup (insertion order) with the
+# same model and a CPU substring overlap either way. Keys are bucketed per model and each
+# bucket keeps a trigram posting list (for "inventory CPU in HCL CPU") and a per-length
+# string map (for "HCL CPU in inventory CPU"), so a lookup never scans the whole HCL.
+NGRAM = 3
+
+def _ngrams(s):
+    return {s[i:i+NGRAM] for i in range(len(s) - NGRAM + 1)}
+
+def build_relaxed_index(hcl_lookup):
+    """norm_model -> {"keys": [(cpu, cands)], "grams": {gram: [pos]}, "by_len": {len: {cpu: pos}}}"""
+    index = {}
+    for (km, kc), cands in hcl_lookup.items():
+        b = index.setdefault(km, {"keys": [], "grams": {}, "by_len": {}})
+        pos = len(b["keys"])
+        b["keys"].append((kc, cands))
+        for g in _ngrams(kc): b["grams"].setdefault(g, []).append(pos)
+        b["by_len"].setdefault(len(kc), {}).setdefault(kc, pos)
+    return index
+
+def relaxed_lookup(index, nm, nc):
+    """Same result as scanning hcl_lookup for km == nm and (nc in kc or kc in nc)."""
+    b = index.get(nm)
+    if not b: return None
+    keys = b["keys"]
+    best = None
+    # HCL CPU contained in inventory CPU: probe every window length present in the bucket
+    for L, strs in b["by_len"].items():
+        if L > len(nc): continue
+        for i in range(len(nc) - L + 1):
+            pos = strs.get(nc[i:i+L])
+            if pos is not None and (best is None or pos < best): best = pos
+    # Inventory CPU contained in HCL CPU: intersect trigram postings, then verify
+    if len(nc) < NGRAM:
+        for pos, (kc, _) in enumerate(keys):
+            if best is not None and pos >= best: break
+            if nc in kc: best = pos; break
+    else:
+        postings = sorted((b["grams"].get(g, ()) for g in _ngrams(nc)), key=len)
+        if postings and postings[0]:
+            rest = [set(p) for p in postings[1:]]
+            for pos in postings[0]:
+                if best is not None and pos >= best: break
+                if all(pos in s for s in rest) and nc in keys[pos][0]: best = pos; break
+    return keys[best][1][0] if best is not None else None
+
+def relaxed_scan(hcl_lookup, nm, nc):
+    """The linear relaxed rule that relaxed_lookup() replaces; kept as its reference."""
+    for (km, kc), cands in hcl_lookup.items():
+        if km == nm and (nc in kc or kc in nc): return cands[0]
+    return None
+
+def check_relaxed_index(hcl, probes=2000):
+    """
+    Compare relaxed_lookup() with relaxed_scan() on HCL keys spread over the lookup, each
+    probed as-is, shortened, extended, cut below the trigram length and under an unknown
+    model. Returns the number of probes; raises AssertionError on the first mismatch.
+    """
+    lookup, index = hcl["lookup"], hcl["relaxed_index"]
+    keys = list(lookup)
+    n = 0
+    for km, kc in keys[::max(1, len(keys) * 5 // probes)]:
+        for nm, nc in ((km, kc), (km, kc[:len(kc) // 2]), (km, kc + " cpu"), (km, kc[:NGRAM - 1]), (km + " x", kc)):
+            if relaxed_lookup(index, nm, nc) is not relaxed_scan(lookup, nm, nc):
+                raise AssertionError(f"relaxed index mismatch for {(nm, nc)!r}")
+            n += 1
+    return n
+
+# =========================
+# Nearest HCL entries
+# =========================
+# Unmatched (model, CPU) pairs get the closest HCL entries as suggestions, e.g. "Dell Inc.
+# PowerEdge R640" -> "PowerEdge R640". Model and CPU tokens go into one inverted index with
+# IDF weights. Candidates come from the query's rarest tokens only (at most
+# SUGGEST_MAX_CANDIDATES keys), then get a weighted Jaccard score, so a lookup does not
+# depend on the HCL size. When even the rarest token is more common than that (a query
+# made only of words like "dell", "poweredge", "xeon"), only the first
+# SUGGEST_MAX_CANDIDATES keys of its posting list, in HCL order, are scored. Query tokens
+# the HCL never uses carry no weight.
+# Suggestions are advisory: the hosts stay Blocked.
+SUGGEST_TOP_K = 3
+SUGGEST_MIN_SCORE = 0.4
+SUGGEST_MAX_CANDIDATES = 256
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+DIGITS_RE = re.compile(r"\d{2,}")
+
+def suggest_tokens(nm, nc):
+    """
+    Normalised model/CPU -> set of "m:"/"c:" tokens; the CPU goes through cpu_key (no "cpu",
+    "processor" noise) and mixed words also add their digit runs (r640 -> 640).
+    """
+    toks = set()
+    for prefix, s in (("m:", nm), ("c:", cpu_key(nc))):
+        for w in TOKEN_RE.findall(s):
+            toks.add(prefix + w)
+            if not w.isdigit():
+                for d in DIGITS_RE.findall(w): toks.add(prefix + d)
+    return toks
+
+def build_suggest_index(hcl_lookup):
+    """{"entries": [HclEntry], "tokens": [frozenset], "weights": [float], "postings": {tok: [pos]}, "idf": {tok: w}}"""
+    entries, tokens, postings = [], [], {}
+    for pos, ((km, kc), cands) in enumerate(hcl_lookup.items()):
+        toks = frozenset(suggest_tokens(km, kc))
+        entries.append(cands[0]); tokens.append(toks)
+        for t in toks: postings.setdefault(t, []).append(pos)
+    n = len(entries)
+    idf = {t: log(1 + n / len(p)) for t, p in postings.items()}
+    weights = [sum(idf[t] for t in toks) for toks in tokens]
+    return {"entries": entries, "tokens": tokens, "weights": weights, "postings": postings, "idf": idf}
+
+def suggest_entries(index, nm, nc, k=SUGGEST_TOP_K):
+    """Top-k [(score, HclEntry)] for a normalised pair, best first; ties keep HCL order."""
+    postings, idf = index["postings"], index["idf"]
+    query = [t for t in suggest_tokens(nm, nc) if t in idf]
+    if not query: return []
+    cands = set()
+    for t in sorted(query, key=lambda t: (len(postings[t]), t)):
+        p, room = postings[t], SUGGEST_MAX_CANDIDATES - len(cands)
+        if len(p) > room:
+            if not cands: cands.update(p[:room])      # rarest token alone is too common: truncate
+            break
+        cands.update(p)
+    count("suggest_candidates", len(cands))
+    qset, qw = frozenset(query), sum(idf[t] for t in query)
+    tokens, weights = index["tokens"], index["weights"]
+    scored = []
+    for pos in cands:
+        shared = sum(idf[t] for t in qset & tokens[pos])
+        # rounded so float summation order (set iteration) cannot reorder near-ties between runs
+        score = round(shared / (qw + weights[pos] - shared), 9)
+        if score >= SUGGEST_MIN_SCORE: scored.append((score, -pos))
+    entries = index["entries"]
+    return [(round(s, 3), entries[-p]) for s, p in heapq.nlargest(k, scored)]
 
 # =========================
-# Matching helpers
+# Records
 # =========================
-def norm_cpu(s: str) -> str:
-    if not s: return ""
-    x = s.replace("®","").replace("(R)","").replace("(r)","")
-    x = re.sub(r"@\s*[\d\.]+\s*ghz", "", x, flags=re.I)
-    return re.sub(r"\s+"," ", x).strip().lower()
+# Compact row types for the HCL dataset and the appendix. Repeated strings (models, CPUs,
+# release text) are interned, and a matched host points at its HclEntry instead of
+# copying its fields, so per-host cost is one small object plus the host name.
+class HclEntry:
+    __slots__ = ("model", "cpu", "code", "releases", "status", "vendor", "versions")
+
+    def __init__(self, model, cpu, code, releases, status, vendor, versions=frozenset()):
+        self.model = sys.intern(model); self.cpu = sys.intern(cpu); self.code = sys.intern(code)
+        self.releases = sys.intern(releases); self.status = status; self.vendor = vendor
+        self.versions = versions
+
+class HostRecord:
+    """
+    Appendix row. inv_model/inv_cpu are only kept when the HCL entry cannot supply them.
+    match is "exact", "relaxed" or "unmatched", or "hcl" for rows taken straight from the
+    HCL when there is no usable inventory.
+    """
+    __slots__ = ("name", "hcl", "inv_model", "inv_cpu", "match", "vcenter", "cluster")
 
-def norm_model(s: str) -> str:
-    if not s: return ""
-    return re.sub(r"\s+"," ", s).strip().lower()
+    def __init__(self, name, hcl=None, inv_model="", inv_cpu="", match="hcl", vcenter="", cluster=""):
+        self.name = name; self.hcl = hcl; self.match = match
+        self.vcenter = sys.intern(vcenter); self.cluster = sys.intern(cluster)
+        self.inv_model = None if hcl is not None and hcl.model else sys.intern(inv_model)
+        self.inv_cpu = None if hcl is not None and hcl.cpu else sys.intern(inv_cpu)
 
-def vendor_from_model(model: str) -> str:
-    if not model: return "Other"
-    m = model.lower()
-    if m.startswith("dell") or "vxrail" in m: return "Dell"
-    if m.startswith("cisco"): return "Cisco"
-    if m.startswith("hpe") or m.startswith("hewlett") or m.startswith("hp "): return "HPE / HP"
-    if m.startswith("lenovo"): return "Lenovo"
-    if m.startswith("vmware"): return "VMware"
-    return "Other"
+    @property
+    def model(self): return self.hcl.model if self.inv_model is None else self.inv_model
+    @property
+    def cpu(self): return self.hcl.cpu if self.inv_cpu is None else self.inv_cpu
+    @property
+    def code(self): return self.hcl.code if self.hcl is not None else ""
+    @property
+    def releases(self): return self.hcl.releases if self.hcl is not None else ""
+    @property
+    def status(self): return self.hcl.status if self.hcl is not None else "Blocked"  # conservative for planning
+    @property
+    def vendor(self): return self.hcl.vendor if self.hcl is not None else vendor_from_model(self.model)
+    @property
+    def versions(self): return self.hcl.versions if self.hcl is not None else frozenset()
+
+class HardwareConfig:
+    """
+    Distinct raw (model, CPU) pair from the inventory, resolved against the HCL once.
+    Unmatched pairs carry their nearest HCL entries as [(score, HclEntry)].
+    """
+    __slots__ = ("model", "cpu", "hcl", "match", "hosts", "suggestions")
+
+    def __init__(self, model, cpu, hcl, match, suggestions=()):
+        self.model = sys.intern(model); self.cpu = sys.intern(cpu)
+        self.hcl = hcl; self.match = match; self.hosts = 0; self.suggestions = suggestions
+
+    @property
+    def status(self): return self.hcl.status if self.hcl is not None else "Blocked"
+    @property
+    def versions(self): return self.hcl.versions if self.hcl is not None else frozenset()
+
+# =========================
+# HCL dataset
+# =========================
+class HclError(Exception):
+    pass
+
+def build_hcl_dataset(hcl_file):
+    """Parse the HCL export into enriched rows, the exact (model, cpu) lookup and the relaxed index.
+    Raises HclError when the CSV cannot be parsed or lacks a required column."""
+    hcl_rows, hcl_headers = stream_csv_robust(hcl_file)
+    if not hcl_rows:
+        raise HclError("Could not parse the HCL systems CSV.")
+
+    # Map columns
+    model_col = pick_column(hcl_headers, ["Model","Server Model","Product","Model Name"])
+    cpu_col   = pick_column(hcl_headers, ["CPU Model","CPU","Processor"])
+    code_col  = pick_column(hcl_headers, ["Code Name","Codename"])
+    rel_col   = pick_column(hcl_headers, ["Supported Releases","Supported versions","Releases","SupportedRelease"])
+    missing = [lab for lab,col in [("Model",model_col),("CPU Model",cpu_col),("Supported Releases",rel_col)] if not col]
+    if missing:
+        raise HclError(f"Required columns not found in your HCL CSV: {', '.join(missing)}\n"
+                       f"Found (normalised) headers: {hcl_headers}")
+
+    # Build enriched HCL dataset (rows are decoded and parsed as they are consumed here)
+    # "Supported Releases" repeats heavily, so each distinct value is parsed and classified once
+    enriched, releases = [], {}
+    with stage("hcl_parse_enrich") as rec:
+        for r in hcl_rows:
+            model = r.get(model_col,""); cpu = r.get(cpu_col,"")
+            code  = r.get(code_col,"") if code_col else ""
+            rels  = r.get(rel_col,"")
+            parsed = releases.get(rels)
+            if parsed is None:
+                versions = parse_releases(rels)
+                parsed = releases[rels] = (versions, classify_versions(versions))
+            enriched.append(HclEntry(model, cpu, code, rels, parsed[1], vendor_from_model(model), parsed[0]))
+        rec.update(rows=len(enriched), distinct_releases=len(releases))
+
+    # Build lookup for appendix: (model, cpu) -> rows
+    with stage("hcl_index") as rec:
+        hcl_lookup = {}
+        for x in enriched:
+            hcl_lookup.setdefault((norm_model(x.model), norm_cpu(x.cpu)), []).append(x)
+        rec.update(keys=len(hcl_lookup))
+
+    return HclDataset(enriched=enriched, lookup=hcl_lookup)
+
+class HclDataset(dict):
+    """
+    {"enriched", "lookup"} plus the derived "relaxed_index" and "suggest_index", which are
+    built from the lookup on first access (they are several times larger than the rows).
+    """
+    def __missing__(self, key):
+        if key == "relaxed_index":
+            with stage("hcl_relaxed_index") as rec:
+                value = build_relaxed_index(self["lookup"])
+                rec["models"] = len(value)
+        elif key == "suggest_index":
+            with stage("hcl_suggest_index") as rec:
+                value = build_suggest_index(self["lookup"])
+                rec["tokens"] = len(value["idf"])
+        else:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+# =========================
+# HCL cache
+# =========================
+# The enriched rows and the exact lookup are pickled under CACHE_DIR, one file per HCL
+# path, as plain columns: each distinct release string is stored once with its parsed
+# versions and the lookup refers to rows by position. The relaxed and suggestion indexes
+# are not cached; HclDataset rebuilds them on first use.
+# A cache entry is only used when path, size, mtime and content hash all still match.
+HCL_CACHE_VERSION = 6
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+
+def hcl_cache_path(hcl_file):
+    digest = hashlib.sha1(os.path.abspath(hcl_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"hcl_{digest}.pickle")
+
+def pack_hcl_dataset(data):
+    """HclDataset -> compact picklable columns (see unpack_hcl_dataset)."""
+    enriched = data["enriched"]
+    releases, pos = {}, {}
+    for i, x in enumerate(enriched):
+        pos[id(x)] = i
+        if x.releases not in releases: releases[x.releases] = (x.versions, x.status)
+    return {"rows": [(x.model, x.cpu, x.code, x.releases, x.vendor) for x in enriched],
+            "releases": releases,
+            "lookup": [(k, [pos[id(x)] for x in cands]) for k, cands in data["lookup"].items()]}
+
+def unpack_hcl_dataset(packed):
+    releases = packed["releases"]
+    enriched = []
+    for model, cpu, code, rels, vendor in packed["rows"]:
+        versions, status = releases[rels]
+        enriched.append(HclEntry(model, cpu, code, rels, status, vendor, versions))
+    hcl_lookup = {k: [enriched[i] for i in rows] for k, rows in packed["lookup"]}
+    return HclDataset(enriched=enriched, lookup=hcl_lookup)
+
+def load_hcl_dataset(hcl_file, use_cache=True):
+    if not use_cache: return build_hcl_dataset(hcl_file)
+    with stage("hcl_fingerprint"):
+        fp = file_fingerprint(hcl_file)
+    cpath = hcl_cache_path(hcl_file)
+    try:
+        with stage("hcl_cache_load") as rec:
+            hit = rec["hit"] = False
+            with open(cpath, "rb") as f: cached = pickle.load(f)
+            hit = cached.get("version") == HCL_CACHE_VERSION and cached.get("fingerprint") == fp
+            if hit: data = unpack_hcl_dataset(cached["data"])
+            rec["hit"] = hit
+        if hit:
+            if DEBUG: print("[CACHE] HCL index loaded from", cpath)
+            return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        if DEBUG: print("[CACHE] Ignoring unreadable cache", cpath, "-", e)
+
+    data = build_hcl_dataset(hcl_file)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{cpath}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": HCL_CACHE_VERSION, "fingerprint": fp, "data": pack_hcl_dataset(data)}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cpath)
+        if DEBUG: print("[CACHE] HCL index written to", cpath)
+    except OSError as e:
+        print("[WARN] Could not write HCL cache:", e)
+    return data
+
+def purge_hcl_cache():
+    n = 0
+    try:
+        for fname in os.listdir(CACHE_DIR):
+            if fname.startswith("hcl_") and fname.endswith(".pickle"):
+                os.remove(os.path.join(CACHE_DIR, fname)); n += 1
+    except FileNotFoundError:
+        pass
+    return n
 
 # =========================
 # Presentation helpers
@@ -253,156 +824,353 @@ def pie_svg_two(ok, blocked, size=160, colors=("var(--blue)", "var(--red)")):
     ring = f"<circle cx='{cx}' cy='{cy}' r='{r}' fill='none' stroke='#ffffff' stroke-width='1'/>"
     return f"<svg viewBox='0 0 {size} {size}' class='pie'>{''.join(parts)}{ring}</svg>"
 
+# ---------- BAR CHART (OK vs Blocked per label) ----------
+def bar_svg_two(rows, width=720, bar=16, label_w=220, colors=("var(--blue)", "var(--red)")):
+    """Horizontal stacked bars for [(label, ok, blocked)], scaled to the largest total; the blocked figure is printed."""
+    gap = 6
+    height = gap + len(rows) * (bar + gap)
+    scale = (width - label_w - 70) / (max((ok + blk for _, ok, blk in rows), default=0) or 1)
+    parts = []
+    for i, (label, ok, blk) in enumerate(rows):
+        y = gap + i * (bar + gap); w_ok, w_blk = ok * scale, blk * scale
+        parts.append(f"<text x='{label_w - 6}' y='{y + bar - 4}' text-anchor='end' font-size='11'>{label}</text>")
+        if ok: parts.append(f"<rect x='{label_w}' y='{y}' width='{w_ok:.1f}' height='{bar}' fill='{colors[0]}'/>")
+        if blk: parts.append(f"<rect x='{label_w + w_ok:.1f}' y='{y}' width='{w_blk:.1f}' height='{bar}' fill='{colors[1]}'/>")
+        parts.append(f"<text x='{label_w + w_ok + w_blk + 4:.1f}' y='{y + bar - 4}' font-size='11'>{blk}</text>")
+    return (f"<svg viewBox='0 0 {width} {height}' class='bars' style='width:100%;max-width:{width}px;height:auto'>"
+            f"{''.join(parts)}</svg>")
+
 # =========================
-# Main
+# Inventory matching
 # =========================
-def main():
-    # Find input files
-    hcl_file = find_hcl_file()
-    if not hcl_file:
-        print("[ERROR] Could not find Systems*.csv in", HCL_DIR)
-        sys.exit(1)
-    inv_file = find_inventory_file()
-
-    # Load HCL systems CSV
-    hcl_rows, hcl_headers = load_csv_robust(hcl_file)
-    if not hcl_rows:
-        print("[ERROR] Could not parse the HCL systems CSV.")
-        sys.exit(1)
+def resolve_hardware(hcl, imodel, icpu):
+    """Returns (HclEntry or None, "exact" | "relaxed" | "unmatched")."""
+    k = (norm_model(imodel), norm_cpu(icpu))
+    match = hcl["lookup"].get(k)
+    if match: return match[0], "exact"
+    # relaxed: same model; CPU substring overlap either way
+    if PROFILE is not None:
+        PROFILE.count("relaxed_lookups")
+        PROFILE.count("relaxed_candidate_keys", len(hcl["relaxed_index"].get(k[0], {}).get("keys", ())))
+    chosen = relaxed_lookup(hcl["relaxed_index"], *k)
+    return (chosen, "relaxed") if chosen else (None, "unmatched")
 
-    # Map columns
-    model_col = pick_column(hcl_headers, ["Model","Server Model","Product","Model Name"])
-    cpu_col   = pick_column(hcl_headers, ["CPU Model","CPU","Processor"])
-    code_col  = pick_column(hcl_headers, ["Code Name","Codename"])
-    rel_col   = pick_column(hcl_headers, ["Supported Releases","Supported versions","Releases","SupportedRelease"])
-    missing = [lab for lab,col in [("Model",model_col),("CPU Model",cpu_col),("Supported Releases",rel_col)] if not col]
-    if missing:
-        print("ERROR: Required columns not found in your HCL CSV:", ", ".join(missing))
-        print("Found (normalised) headers:", hcl_headers); sys.exit(1)
-
-    # Build enriched HCL dataset
-    enriched = []
-    for r in hcl_rows:
-        model = r.get(model_col,""); cpu = r.get(cpu_col,"")
-        code  = r.get(code_col,"") if code_col else ""
-        rels  = r.get(rel_col,"")
-        status = classify_support(rels)
-        enriched.append({
-            "Model": model,
-            "CPU Model": cpu,
-            "Code Name": code,
-            "Supported Releases": rels,
-            "Status": status,
-            "Vendor": vendor_from_model(model)
-        })
-
-    # Inventory data (for server names in appendix)
-    inv_rows, inv_headers = [], []
+def open_inventory(inv_file):
+    """
+    Returns (rows, (name_col, model_col, cpu_col, vcenter_col, cluster_col, sockets_col, cores_col,
+    memory_col)), or (None, None) without a usable inventory. Columns after cpu_col are optional (None).
+    """
+    inv_rows, inv_headers = None, []
     if inv_file:
-        inv_rows, inv_headers = load_csv_robust(inv_file)
+        inv_rows, inv_headers = stream_ops_inventory(inv_file) if is_ops_url(inv_file) else stream_csv_robust(inv_file)
         if not inv_rows:
             print("[WARN] Could not parse the Host Inventory CSV - Appendix will omit server names.")
 
     inv_name_col  = pick_column(inv_headers, ["Name","Hostname","Host Name"])
     inv_model_col = pick_column(inv_headers, ["Model"])
     inv_cpu_col   = pick_column(inv_headers, ["CPU Model","Processor"])
-
-    # Build lookup for appendix: (model, cpu) -> rows
-    hcl_lookup = {}
-    for x in enriched:
-        hcl_lookup.setdefault((norm_model(x["Model"]), norm_cpu(x["CPU Model"])), []).append(x)
-
-    appendix = []
+    inv_vc_col    = pick_column(inv_headers, ["Parent vCenter","vCenter"])
+    inv_cl_col    = pick_column(inv_headers, ["Parent Cluster","Cluster"])
+    cap_cols = tuple(pick_column(inv_headers, names) for names in CAPACITY_COLUMNS.values())
     if inv_rows and inv_name_col and inv_model_col and inv_cpu_col:
-        for r in inv_rows:
-            name = r.get(inv_name_col,""); imodel = r.get(inv_model_col,""); icpu = r.get(inv_cpu_col,"")
-            k = (norm_model(imodel), norm_cpu(icpu))
-            match = hcl_lookup.get(k)
-            chosen = match[0] if match else None
-            if not chosen:
-                # relaxed: same model; CPU substring overlap either way
-                nm, nc = k
-                for key, cands in hcl_lookup.items():
-                    km, kc = key
-                    if km == nm and (nc in kc or kc in nc):
-                        chosen = cands[0]; break
-            if chosen:
-                appendix.append({
-                    "Name": name,
-                    "Model": chosen["Model"] or imodel,
-                    "CPU Model": chosen["CPU Model"] or icpu,
-                    "Code Name": chosen["Code Name"],
-                    "Supported Releases": chosen["Supported Releases"],
-                    "Status": chosen["Status"]
-                })
+        return inv_rows, (inv_name_col, inv_model_col, inv_cpu_col, inv_vc_col, inv_cl_col) + cap_cols
+    return None, None
+
+def iter_host_records(hcl, inventory, configs, known=None, capacity=None, suggest=True):
+    """
+    Yield one HostRecord per inventory host, resolving each distinct raw (model, CPU) pair
+    once and recording it in configs. known maps raw pairs to a (match, hcl_key) result
+    that is still valid (incremental runs) and skips resolution for them. capacity
+    (CapacityColumns) collects each host's sockets, cores and memory. suggest=False skips
+    the nearest-entry suggestions (only the HTML report shows them).
+    Without an inventory, yields the HCL rows themselves.
+    """
+    inv_rows, cols = inventory
+    if inv_rows is None:
+        for x in hcl["enriched"]: yield HostRecord("", x)
+        return
+    inv_name_col, inv_model_col, inv_cpu_col, inv_vc_col, inv_cl_col = cols[:5]
+    for r in inv_rows:
+        name = r.get(inv_name_col,""); key = (r.get(inv_model_col,""), r.get(inv_cpu_col,""))
+        cfg = configs.get(key)
+        if cfg is None:
+            if known and key in known:
+                match, hkey = known[key]
+                cfg = configs[key] = HardwareConfig(key[0], key[1], hcl["lookup"][hkey][0] if hkey else None, match)
+                count("incremental_reused_pairs")
             else:
-                appendix.append({
-                    "Name": name, "Model": imodel, "CPU Model": icpu,
-                    "Code Name": "", "Supported Releases": "", "Status": "Blocked"  # conservative for planning
-                })
-    else:
-        for x in enriched:
-            appendix.append({
-                "Name": "",
-                "Model": x["Model"],
-                "CPU Model": x["CPU Model"],
-                "Code Name": x["Code Name"],
-                "Supported Releases": x["Supported Releases"],
-                "Status": x["Status"]
-            })
+                cfg = configs[key] = HardwareConfig(key[0], key[1], *resolve_hardware(hcl, *key))
+            if suggest and cfg.match == "unmatched":
+                cfg.suggestions = suggest_entries(hcl["suggest_index"], norm_model(key[0]), norm_cpu(key[1]))
+        cfg.hosts += 1
+        vc = r.get(inv_vc_col, "") if inv_vc_col else ""; cl = r.get(inv_cl_col, "") if inv_cl_col else ""
+        if capacity is not None: capacity.add(r, cfg, vc, cl)
+        # unmatched hosts keep their own model/CPU and are Blocked
+        yield HostRecord(name, cfg.hcl, cfg.model, cfg.cpu, cfg.match, vc, cl)
 
-    # Summary counts (OK vs Blocked) for HCL-only section
-    ok_count = sum(1 for x in enriched if x["Status"] == "OK")
-    blocked_count = sum(1 for x in enriched if x["Status"] == "Blocked")
-    total_count = ok_count + blocked_count if (ok_count + blocked_count) > 0 else 1
-    pct_ok = f"{(ok_count/total_count*100):.1f}%"
+def _count_configs(n_hosts, configs):
+    if DEBUG: print(f"[MATCH] {n_hosts} hosts, {len(configs)} distinct model/CPU pairs")
+    if PROFILE is not None:
+        count("inventory_rows", n_hosts); count("distinct_pairs", len(configs))
+        for c in configs.values():
+            count(f"pairs_{c.match}"); count(f"hosts_{c.match}", c.hosts)
 
-    # Appendix counts (based on full inventory mapping)
-    inv_ok = sum(1 for r in appendix if r["Status"] == "OK")
-    inv_blocked = sum(1 for r in appendix if r["Status"] == "Blocked")
-    inv_total = inv_ok + inv_blocked if (inv_ok + inv_blocked) > 0 else 1
-    inv_pct_ok = f"{(inv_ok/inv_total*100):.1f}%"
+def match_inventory(hcl, inv_file, known=None):
+    """
+    Map each inventory host to its HCL entry (exact, then relaxed). Hosts are grouped by
+    raw (model, CPU) so each distinct pair is normalised and resolved once. Without a
+    usable inventory the appendix falls back to the HCL rows themselves.
+    Returns {"appendix": [HostRecord], "configs": [HardwareConfig], "inventory_used": bool,
+    "capacity": aggregate_capacity() result or None}.
+    """
+    inventory, configs = open_inventory(inv_file), {}
+    cols = inventory[1]
+    capacity = CapacityColumns(cols[5:]) if cols and any(cols[5:]) else None
+    appendix = list(iter_host_records(hcl, inventory, configs, known, capacity))
+    inventory_used = inventory[0] is not None
+    if inventory_used: _count_configs(len(appendix), configs)
+    if capacity is not None:
+        with stage("capacity_aggregate", hosts=len(capacity.key)):
+            capacity = aggregate_capacity(capacity)
+    return {"appendix": appendix, "configs": list(configs.values()), "inventory_used": inventory_used,
+            "capacity": capacity}
 
-    # Build HTML
-    banner = image_to_data_uri(HEADER_IMG)
+# =========================
+# Capacity aggregation
+# =========================
+# Sockets, Cores and Memory (GB) are kept in typed arrays (array module), one slot per
+# host, next to a group id for the host's (configuration, vCenter, cluster). Raw cell
+# values repeat heavily, so each distinct string is parsed once. One pass over the arrays
+# sums them per group, and the few group totals are then rolled up by status, vendor,
+# vCenter and cluster.
+CAPACITY_COLUMNS = {
+    "sockets": ["Sockets","CPU Sockets","Num CPU Sockets"],
+    "cores":   ["Cores","CPU Cores","Num CPU Cores"],
+    "memory":  ["Memory (GB)","Memory GB","Memory"],
+}
+CAPACITY_DIMENSIONS = ("status", "vendor", "vcenter", "cluster")
+CAPACITY_TOP_CLUSTERS = 15
+
+def parse_number(s):
+    """'766.63', '766,63', '1,024', '1.024,5' or '' -> float (0.0 when unparseable or negative)."""
+    s = s.strip()
+    if "," in s and s.rfind(",") > s.rfind(".") > -1: s = s.replace(".", "").replace(",", ".")   # 1.024,5
+    elif s.count(",") == 1 and "." not in s and len(s.rsplit(",", 1)[1]) != 3: s = s.replace(",", ".")   # decimal comma
+    else: s = s.replace(",", "")                                                                        # thousands
+    try: v = float(s)
+    except ValueError: return 0.0
+    return v if v > 0 and isfinite(v) else 0.0
+
+class CapacityColumns:
+    """Per-host sockets/cores/memory in compact arrays, in appendix order."""
+    __slots__ = ("cols", "sockets", "cores", "memory", "key", "groups", "_parsed")
+
+    def __init__(self, cols):
+        self.cols = cols                                    # (sockets_col, cores_col, memory_col), each may be None
+        self.sockets = array("H"); self.cores = array("I"); self.memory = array("f")
+        self.key = array("I"); self.groups = {}             # (HardwareConfig, vcenter, cluster) -> group id
+        self._parsed = ({}, {}, {})
+
+    def add(self, row, cfg, vcenter, cluster):
+        """Append one host. A missing column reads as "" and counts as 0."""
+        sc, cc, mc = self.cols; ps, pc, pm = self._parsed
+        raw = row.get(sc, ""); v = ps.get(raw)
+        if v is None: v = ps[raw] = min(int(parse_number(raw)), 0xFFFF)
+        self.sockets.append(v)
+        raw = row.get(cc, ""); v = pc.get(raw)
+        if v is None: v = pc[raw] = min(int(parse_number(raw)), 0xFFFFFFFF)
+        self.cores.append(v)
+        raw = row.get(mc, ""); v = pm.get(raw)
+        if v is None: v = pm[raw] = parse_number(raw)
+        self.memory.append(v)
+        g = self.groups.get((cfg, vcenter, cluster))
+        if g is None: g = self.groups[(cfg, vcenter, cluster)] = len(self.groups)
+        self.key.append(g)
+
+def aggregate_capacity(cap):
+    """
+    {"status": {status: totals}, "vendor" | "vcenter": {label: {status: totals}},
+     "cluster": {(vcenter, cluster): {status: totals}}} with totals = [hosts, sockets, cores, memory GB].
+    """
+    totals = [[0, 0, 0, 0.0] for _ in range(len(cap.groups))]
+    for g, s, c, m in zip(cap.key, cap.sockets, cap.cores, cap.memory):
+        t = totals[g]; t[0] += 1; t[1] += s; t[2] += c; t[3] += m
+    out = {d: {} for d in CAPACITY_DIMENSIONS}
+    for (cfg, vc, cl), g in cap.groups.items():
+        status = cfg.status
+        vendor = cfg.hcl.vendor if cfg.hcl is not None else vendor_from_model(cfg.model)
+        for d, label in (("vendor", vendor), ("vcenter", vc or "(no vCenter)"),
+                         ("cluster", (vc or "(no vCenter)", cl or "(no cluster)"))):
+            acc = out[d].setdefault(label, {}).setdefault(status, [0, 0, 0, 0.0])
+            for i, v in enumerate(totals[g]): acc[i] += v
+        acc = out["status"].setdefault(status, [0, 0, 0, 0.0])
+        for i, v in enumerate(totals[g]): acc[i] += v
+    return out
+
+# =========================
+# Incremental runs
+# =========================
+# With --incremental the previous run's state for an inventory is kept under CACHE_DIR:
+# per-host (model, CPU, status), each raw model/CPU pair's resolution and the HCL key
+# order per normalised model. A stored resolution is reused while its model's HCL
+# bucket still has the same keys in the same order, which is exactly when exact and
+# relaxed matching would pick the same key again. Everything else is re-matched.
+INCREMENTAL_STATE_VERSION = 1
+
+def inventory_source(inv_file):
+    return inv_file if is_ops_url(inv_file) else os.path.abspath(inv_file)
 
-    html = []
-    html.append("<!doctype html><html><head><meta charset='utf-8'>")
-    html.append("<title>VCF 9.0 Hardware Compatibility — Hardware Compatibility Guide Snapshot</title>")
-    html.append(css_styles())
-    html.append("</head><body>")
+def inventory_state_path(inv_file):
+    digest = hashlib.sha1(inventory_source(inv_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"state_{digest}.pickle")
+
+def load_inventory_state(inv_file):
+    try:
+        with open(inventory_state_path(inv_file), "rb") as f: state = pickle.load(f)
+        return state if state.get("version") == INCREMENTAL_STATE_VERSION else None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        if DEBUG: print("[STATE] Ignoring unreadable state for", inv_file, "-", e)
+        return None
+
+def save_inventory_state(inv_file, state):
+    path = inventory_state_path(inv_file)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print("[WARN] Could not save incremental state:", e)
+
+def hcl_bucket_signatures(hcl):
+    """Digest of the ordered HCL CPU keys per normalised model (the relaxed index buckets)."""
+    buckets = {}
+    for km, kc in hcl["lookup"]: buckets.setdefault(km, []).append(kc)
+    return {nm: hashlib.sha1("\x00".join(cpus).encode("utf-8")).hexdigest() for nm, cpus in buckets.items()}
+
+def reusable_resolutions(prev, buckets):
+    if not prev: return {}
+    old = prev["buckets"]
+    return {pair: (match, hkey) for pair, (nm, match, hkey) in prev["pairs"].items() if old.get(nm) == buckets.get(nm)}
+
+def build_inventory_state(hcl, buckets, configs, hosts):
+    pairs = {}
+    for c in configs:
+        hkey = (norm_model(c.hcl.model), norm_cpu(c.hcl.cpu)) if c.hcl is not None else None
+        pairs[(c.model, c.cpu)] = (norm_model(c.model), c.match, hkey)
+    return {"version": INCREMENTAL_STATE_VERSION, "generated": datetime.now().strftime('%d %B %Y, %H:%M'),
+            "buckets": buckets, "pairs": pairs, "hosts": hosts,
+            "hcl_status": {k: cands[0].status for k, cands in hcl["lookup"].items()}}
+
+def diff_inventory_state(prev, state):
+    old, new = prev["hosts"], state["hosts"]
+    changes = {"since": prev["generated"], "newly_ok": [], "newly_blocked": [], "new_hosts": [], "removed_hosts": []}
+    for name, (model, cpu, status) in new.items():
+        was = old.get(name)
+        if was is None: changes["new_hosts"].append((name, model, cpu, status))
+        elif was[2] != status:
+            changes["newly_ok" if status == "OK" else "newly_blocked"].append((name, model, cpu, status))
+    changes["removed_hosts"] = [(name, *old[name]) for name in old if name not in new]
+    old_hcl, new_hcl = prev["hcl_status"], state["hcl_status"]
+    changes["hcl_added"] = sum(1 for k in new_hcl if k not in old_hcl)
+    changes["hcl_removed"] = sum(1 for k in old_hcl if k not in new_hcl)
+    changes["hcl_status_changed"] = sum(1 for k, st in new_hcl.items() if k in old_hcl and old_hcl[k] != st)
+    return changes
+
+# =========================
+# Machine-readable exports
+# =========================
+# Host and HCL records are streamed to JSON Lines and/or CSV next to the HTML report
+# (<report>_hosts.jsonl, <report>_hcl.csv, ...). These writers never touch the HTML
+# builder, and with --no-html the hosts are written as they are matched.
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_HOST_FIELDS = ["name", "model", "cpu_model", "code_name", "supported_releases", "status", "vendor", "match"]
+EXPORT_HCL_FIELDS = ["model", "cpu_model", "code_name", "supported_releases", "status", "vendor"]
+
+def host_export_row(r):
+    return (r.name, r.model, r.cpu, r.code, r.releases, r.status, r.vendor, r.match)
+
+def hcl_export_row(x):
+    return (x.model, x.cpu, x.code, x.releases, x.status, x.vendor)
+
+def export_paths(out_html, kind, formats):
+    base = os.path.splitext(out_html)[0]
+    return {fmt: f"{base}_{kind}.{fmt}" for fmt in formats}
+
+def export_records(paths, fields, rows):
+    """Write each row tuple to every requested format in a single pass. Returns the row count."""
+    n = 0
+    with ExitStack() as stack:
+        writers = []
+        if "jsonl" in paths:
+            jf = stack.enter_context(open(paths["jsonl"], "w", encoding="utf-8", buffering=HTML_BUFFER_BYTES))
+            writers.append(lambda t: jf.write(json.dumps(dict(zip(fields, t)), ensure_ascii=False) + "\n"))
+        if "csv" in paths:
+            cf = stack.enter_context(open(paths["csv"], "w", encoding="utf-8", newline="", buffering=HTML_BUFFER_BYTES))
+            cw = csv.writer(cf); cw.writerow(fields)
+            writers.append(cw.writerow)
+        for t in rows:
+            for write in writers: write(t)
+            n += 1
+    return n
+
+# =========================
+# Report rendering
+# =========================
+# Sections are written straight to a buffered file handle as they are produced, so the
+# document is never held in memory as a whole.
+HTML_BUFFER_BYTES = 1 << 16
+
+def _fragment_writer(f):
+    """Write fragments separated by newlines (same bytes as joining them) without keeping them in memory."""
+    sep = [""]
+    def emit(fragment):
+        f.write(sep[0]); f.write(fragment); sep[0] = "\n"
+    return emit
+
+def _render_head(emit, changes=None, capacity=None):
+    banner = image_to_data_uri(HEADER_IMG)
+    emit("<!doctype html><html><head><meta charset='utf-8'>")
+    emit("<title>VCF 9.0 Hardware Compatibility — Hardware Compatibility Guide Snapshot</title>")
+    emit(css_styles())
+    emit("</head><body>")
 
     if banner:
-        html.append(f"<img class='banner' src='{banner}' alt='Cover'>")
+        emit(f"<img class='banner' src='{banner}' alt='Cover'>")
 
-    html.append("<div class='layout'>")
+    emit("<div class='layout'>")
 
     # Sidebar (sticky)
-    html.append("""
+    changes_link = '\n        <a href="#changes">Changes Since Last Report</a>' if changes else ""
+    if capacity: changes_link = '\n        <a href="#capacity">Capacity Readiness</a>' + changes_link
+    emit(f"""
       <nav class="sidebar" aria-label="Contents">
         <h3>Contents</h3>
         <a href="#overview">Report Overview</a>
         <a href="#lifecycle">VMware vSphere 8 Lifecycle and Upgrade Planning</a>
-        <a href="#summary">Hardware Compatibility Guide Support Summary</a>
+        <a href="#summary">Hardware Compatibility Guide Support Summary</a>{changes_link}
         <a href="#detail">Per-entry Detail (by Vendor)</a>
         <a href="#appendix">Appendix: Full Inventory</a>
       </nav>
     """)
 
+def _render_overview(emit):
     # Main content
-    html.append("<main class='content'>")
-    html.append("<h1>VCF 9.0 Hardware Compatibility — Hardware Compatibility Guide Snapshot</h1>")
+    emit("<main class='content'>")
+    emit("<h1>VCF 9.0 Hardware Compatibility — Hardware Compatibility Guide Snapshot</h1>")
 
     # Report Overview + BCG context callout
-    html.append('<section id="overview">')
-    html.append("<h2>Report Overview</h2>")
-    html.append("""
+    emit('<section id="overview">')
+    emit("<h2>Report Overview</h2>")
+    emit("""
     With the release of VMware Cloud Foundation (VCF) 9.0, 
     one of the pre-checks is to confirm hardware compatibility. This report provides a current snapshot of compatibility 
     based on inventory extracted from VCF Operations and verified against the official 
     <a href="https://compatibilityguide.broadcom.com/" target="_blank">Broadcom Hardware Compatibility Guide</a>.
     """)
-    html.append("""
+    emit("""
     <div class="callout">
       <b>Important context:</b><br>
       The Broadcom Compatibility Guide (BCG) has recently been updated to include a preliminary set of devices for VCF 9.0. 
@@ -420,12 +1188,12 @@ def main():
       <a href="https://knowledge.broadcom.com/external/article/391170" target="_blank">KB 391170</a>
     </p>
     """)
-    html.append("</section>")
+    emit("</section>")
 
     # vSphere 8 lifecycle
-    html.append('<section id="lifecycle">')
-    html.append("<h2>VMware vSphere 8 Lifecycle and Upgrade Planning</h2>")
-    html.append("""
+    emit('<section id="lifecycle">')
+    emit("<h2>VMware vSphere 8 Lifecycle and Upgrade Planning</h2>")
+    emit("""
     <div class="callout">
       VMware vSphere 8.0 (released 11 October 2022) follows VMware’s standard lifecycle policy:<br>
       • <b>End of General Support (EoGS):</b> 11 October 2027<br>
@@ -433,112 +1201,1216 @@ def main():
    
     </div>
     """)
-    html.append("</section>")
+    emit("</section>")
+
+def _target_cells(versions, targets, memo):
+    return "".join(f"<td>{'OK' if ok else 'Blocked'}</td>" for ok in target_flags(versions, targets, memo)[1:])
+
+def _render_release_matrix(emit, enriched, configs, targets):
+    # One pass over HCL entries and one over distinct configurations, counting every target at once
+    memo, n = {}, len(targets)
+    hcl_ok, inv_ok, inv_total = [0] * n, [0] * n, 0
+    for x in enriched:
+        for i, ok in enumerate(target_flags(x.versions, targets, memo)):
+            if ok: hcl_ok[i] += 1
+    for c in configs:
+        inv_total += c.hosts
+        for i, ok in enumerate(target_flags(c.versions, targets, memo)):
+            if ok: inv_ok[i] += c.hosts
+    total = len(enriched)
+    emit("<h3>Release Targets</h3>")
+    emit("""
+    Readiness for each configured release target. A target without an update (e.g. ESXi 9.0) is met by any update
+    of that release; a target with one (e.g. ESXi 8.0 U3) needs that update to be listed.
+    """)
+    emit("<div class='kpi'>")
+    for i, (label, _) in enumerate(targets):
+        ok, blocked = (inv_ok[i], inv_total - inv_ok[i]) if configs else (hcl_ok[i], total - hcl_ok[i])
+        emit(f"<div><div class='vendor-title'>{label}</div>{pie_svg_two(ok, blocked, size=120)}</div>")
+    emit("</div>")
+    emit("<table><thead><tr><th>Target</th><th>HCL OK</th><th>HCL Blocked</th><th>HCL OK %</th>"
+         + ("<th>Hosts OK</th><th>Hosts Blocked</th><th>Hosts OK %</th>" if configs else "")
+         + "</tr></thead><tbody>")
+    for i, (label, _) in enumerate(targets):
+        row = (f"<td>{label}</td><td>{hcl_ok[i]}</td><td>{total - hcl_ok[i]}</td>"
+               f"<td>{(hcl_ok[i] / total * 100 if total else 0):.1f}%</td>")
+        if configs:
+            row += (f"<td>{inv_ok[i]}</td><td>{inv_total - inv_ok[i]}</td>"
+                    f"<td>{(inv_ok[i] / inv_total * 100 if inv_total else 0):.1f}%</td>")
+        emit(f"<tr>{row}</tr>")
+    emit("</tbody></table>")
+
+def _render_summary(emit, enriched, configs=(), targets=()):
+    # Summary counts (OK vs Blocked) for HCL-only section
+    ok_count = sum(1 for x in enriched if x.status == "OK")
+    blocked_count = sum(1 for x in enriched if x.status == "Blocked")
+    total_count = ok_count + blocked_count if (ok_count + blocked_count) > 0 else 1
+    pct_ok = f"{(ok_count/total_count*100):.1f}%"
 
     # HCL Summary (pie OK vs Blocked)
-    html.append('<section id="summary">')
-    html.append("<h2>Hardware Compatibility Guide Support Summary</h2>")
-    html.append("""
+    emit('<section id="summary">')
+    emit("<h2>Hardware Compatibility Guide Support Summary</h2>")
+    emit("""
     This section summarises installation readiness for <b>vSphere 9.0</b> using the Broadcom Compatibility Guide. 
     <i>OK</i> means the server/CPU combination appears as installable on ESXi 9.0 in the guide. 
     <i>Blocked</i> means the guide caps support at ESXi 8.x or the CPU family is discontinued in 9.x, so the installer will block. 
     If a system does not show as OK, treat it as not ready for VCF 9.0 until confirmed otherwise with your OEM or the guide.
     """)
     pie = pie_svg_two(ok_count, blocked_count, size=160)
-    html.append("<div class='kpi'>")
-    html.append(pie)
-    html.append(f"""
+    emit("<div class='kpi'>")
+    emit(pie)
+    emit(f"""
       <div class="legend2" aria-label="Summary figures">
         <div><span class="chip ok"></span> OK: <b>{ok_count}</b> ({pct_ok})</div>
         <div><span class="chip blocked"></span> Blocked: <b>{blocked_count}</b></div>
         <div>Total hardware models analysed: <b>{ok_count + blocked_count}</b></div>
       </div>
     """)
-    html.append("</div>")
-    html.append("</section>")
+    emit("</div>")
+    if len(targets) > 1:
+        _render_release_matrix(emit, enriched, configs, targets)
+    extra_th, memo = "".join(f"<th>{label}</th>" for label, _ in targets[1:]), {}
+    if configs:
+        emit("<h3>Inventory Hardware Configurations</h3>")
+        emit("<table><thead><tr>"
+             f"<th>Model</th><th>CPU Model</th><th>Hosts</th><th>Match</th><th>Status</th>{extra_th}"
+             "</tr></thead><tbody>")
+        for c in sorted(configs, key=lambda c: (-c.hosts, c.model, c.cpu)):
+            cls = "ok-row" if c.status == "OK" else "blocked-row"
+            emit(
+                f"<tr class='{cls}'>"
+                f"<td>{c.model}</td>"
+                f"<td>{c.cpu}</td>"
+                f"<td>{c.hosts}</td>"
+                f"<td>{c.match.capitalize()}</td>"
+                f"<td>{c.status}</td>"
+                f"{_target_cells(c.versions, targets, memo) if extra_th else ''}"
+                "</tr>"
+            )
+        emit("</tbody></table>")
+        _render_suggestions(emit, configs)
+    emit("</section>")
+
+def _render_suggestions(emit, configs):
+    unmatched = sorted((c for c in configs if c.suggestions), key=lambda c: (-c.hosts, c.model, c.cpu))
+    if not unmatched: return
+    emit("<h3>Nearest HCL Entries for Unmatched Configurations</h3>")
+    emit("""
+    These configurations matched no HCL entry exactly or by CPU overlap, so their hosts are reported as Blocked.
+    The closest entries by model and CPU wording are listed (score 0–1) to help spot vendor naming drift;
+    confirm a suggestion against the guide before relying on it.
+    """)
+    emit("<table><thead><tr>"
+         "<th>Model</th><th>CPU Model</th><th>Hosts</th><th>Suggested Model</th><th>Suggested CPU Model</th><th>Status</th><th>Score</th>"
+         "</tr></thead><tbody>")
+    for c in unmatched:
+        span = len(c.suggestions)
+        lead = f"<td rowspan='{span}'>{c.model}</td><td rowspan='{span}'>{c.cpu}</td><td rowspan='{span}'>{c.hosts}</td>"
+        for i, (score, x) in enumerate(c.suggestions):
+            cls = "ok-row" if x.status == "OK" else "blocked-row"
+            emit(f"<tr class='{cls}'>{lead if i == 0 else ''}<td>{x.model}</td><td>{x.cpu}</td><td>{x.status}</td><td>{score:.2f}</td></tr>")
+    emit("</tbody></table>")
+
+def _capacity_row(label, by_status):
+    ok, blk = by_status.get("OK", (0, 0, 0, 0.0)), by_status.get("Blocked", (0, 0, 0, 0.0))
+    hosts, sockets, cores, mem = (a + b for a, b in zip(ok, blk))
+    cls = "blocked-row" if blk[0] else "ok-row"
+    return (f"<tr class='{cls}'><td>{label}</td><td>{hosts}</td><td>{sockets}</td><td>{cores}</td><td>{mem:.0f}</td>"
+            f"<td>{blk[0]}</td><td>{blk[1]}</td><td>{blk[2]}</td><td>{blk[3]:.0f}</td>"
+            f"<td>{(blk[2] / cores * 100 if cores else 0):.1f}%</td></tr>")
+
+def _blocked_cores(by_status):
+    return by_status.get("Blocked", (0, 0, 0, 0.0))[2]
+
+def _render_capacity(emit, capacity):
+    ok, blk = capacity["status"].get("OK", (0, 0, 0, 0.0)), capacity["status"].get("Blocked", (0, 0, 0, 0.0))
+    emit('<section id="capacity">')
+    emit("<h2>Capacity Readiness</h2>")
+    emit("""
+    Readiness weighted by capacity rather than host count, from the inventory's Sockets, Cores and Memory (GB) columns.
+    Blocked cores and memory are the capacity that needs a hardware refresh (or stays on vSphere 8) before VCF 9.0,
+    which is what licensing and refresh planning work from.
+    """)
+    emit("<div class='kpi'>")
+    for title, i in (("Cores", 2), ("Memory", 3)):
+        emit(f"<div><div class='vendor-title'>{title}</div>{pie_svg_two(ok[i], blk[i], size=120)}</div>")
+    emit(f"""
+      <div class="legend2" aria-label="Capacity summary">
+        <div><span class="chip ok"></span> OK: <b>{ok[2]}</b> cores, <b>{ok[3]:.0f}</b> GB memory ({ok[0]} hosts, {ok[1]} sockets)</div>
+        <div><span class="chip blocked"></span> Blocked: <b>{blk[2]}</b> cores, <b>{blk[3]:.0f}</b> GB memory ({blk[0]} hosts, {blk[1]} sockets)</div>
+        <div>Cores blocked: <b>{(blk[2] / (ok[2] + blk[2]) * 100 if ok[2] + blk[2] else 0):.1f}%</b> &nbsp;|&nbsp;
+             Memory blocked: <b>{(blk[3] / (ok[3] + blk[3]) * 100 if ok[3] + blk[3] else 0):.1f}%</b></div>
+      </div>
+    """)
+    emit("</div>")
+
+    clusters = sorted(capacity["cluster"].items(), key=lambda kv: (-_blocked_cores(kv[1]), kv[0]))
+    top = [(f"{vc} / {cl}", st.get("OK", (0, 0, 0))[2], _blocked_cores(st))
+           for (vc, cl), st in clusters[:CAPACITY_TOP_CLUSTERS]]
+    if top:
+        emit(f"<h3>Cores by Cluster (top {len(top)} by blocked cores)</h3>")
+        emit(bar_svg_two(top))
+
+    head = ("<table><thead><tr><th>{}</th><th>Hosts</th><th>Sockets</th><th>Cores</th><th>Memory (GB)</th>"
+            "<th>Blocked Hosts</th><th>Blocked Sockets</th><th>Blocked Cores</th><th>Blocked Memory (GB)</th>"
+            "<th>Cores Blocked %</th></tr></thead><tbody>")
+    vendors = ["Dell","Cisco","HPE / HP","Lenovo","VMware","Other"]
+    for title, label, rows in (
+            ("By Vendor", "Vendor", sorted(capacity["vendor"].items(), key=lambda kv: (vendors.index(kv[0]) if kv[0] in vendors else len(vendors), kv[0]))),
+            ("By vCenter", "vCenter", sorted(capacity["vcenter"].items())),
+            ("By Cluster", "Cluster", [(f"{vc} / {cl}", st) for (vc, cl), st in clusters])):
+        emit(f"<h3>{title}</h3>")
+        emit(head.format(label))
+        for name, st in rows: emit(_capacity_row(name, st))
+        emit("</tbody></table>")
+    emit("</section>")
+
+def _render_changes(emit, changes):
+    emit('<section id="changes">')
+    emit("<h2>Changes Since Last Report</h2>")
+    emit(f"""
+    Compared with the previous run on <b>{changes['since']}</b>. Hosts are identified by name;
+    a host is <i>newly OK</i> or <i>newly Blocked</i> when its status differs from that run.
+    """)
+    emit(f"""
+      <div class="legend2" aria-label="Changes summary">
+        <div><span class="chip ok"></span> Newly OK: <b>{len(changes['newly_ok'])}</b></div>
+        <div><span class="chip blocked"></span> Newly Blocked: <b>{len(changes['newly_blocked'])}</b></div>
+        <div>New hosts: <b>{len(changes['new_hosts'])}</b> &nbsp;|&nbsp; Removed hosts: <b>{len(changes['removed_hosts'])}</b></div>
+        <div class="tiny">HCL entries added: {changes['hcl_added']}, removed: {changes['hcl_removed']}, status changed: {changes['hcl_status_changed']}</div>
+      </div>
+    """)
+    for title, key in (("Newly OK", "newly_ok"), ("Newly Blocked", "newly_blocked"),
+                       ("New Hosts", "new_hosts"), ("Removed Hosts", "removed_hosts")):
+        rows = changes[key]
+        if not rows: continue
+        emit(f"<h3>{title}</h3>")
+        emit("<table><thead><tr>"
+             "<th>Name</th><th>Model</th><th>CPU Model</th><th>Status</th>"
+             "</tr></thead><tbody>")
+        for name, model, cpu, status in rows:
+            cls = "ok-row" if status == "OK" else "blocked-row"
+            emit(f"<tr class='{cls}'><td>{name}</td><td>{model}</td><td>{cpu}</td><td>{status}</td></tr>")
+        emit("</tbody></table>")
+    emit("</section>")
 
+def _render_vendor_detail(emit, enriched, targets=()):
     # Detail by vendor
-    html.append('<section id="detail">')
-    html.append("<h2>Detail by Vendor</h2>")
+    emit('<section id="detail">')
+    emit("<h2>Detail by Vendor</h2>")
     vendors = ["Dell","Cisco","HPE / HP","Lenovo","VMware","Other"]
     groups = {v: [] for v in vendors}
-    for x in enriched: groups.setdefault(x["Vendor"], []).append(x)
+    for x in enriched: groups.setdefault(x.vendor, []).append(x)
 
+    extra_th, memo = "".join(f"<th>{label}</th>" for label, _ in targets[1:]), {}
     for v in vendors:
         items = groups.get(v, [])
         if not items: continue
-        html.append(f"<div class='vendor-title'>{v}</div>")
-        html.append("<table><thead><tr>"
-                    "<th>Model</th><th>CPU Model</th><th>Code Name</th><th>Supported Releases</th><th>Status</th>"
-                    "</tr></thead><tbody>")
-        items.sort(key=lambda r: (r["Model"], r["CPU Model"]))
+        emit(f"<div class='vendor-title'>{v}</div>")
+        emit("<table><thead><tr>"
+             f"<th>Model</th><th>CPU Model</th><th>Code Name</th><th>Supported Releases</th><th>Status</th>{extra_th}"
+             "</tr></thead><tbody>")
+        items.sort(key=lambda r: (r.model, r.cpu))
         for x in items:
-            cls = "ok-row" if x["Status"] == "OK" else "blocked-row"
-            html.append(
+            cls = "ok-row" if x.status == "OK" else "blocked-row"
+            emit(
                 f"<tr class='{cls}'>"
-                f"<td>{x['Model']}</td>"
-                f"<td>{x['CPU Model']}</td>"
-                f"<td>{x['Code Name']}</td>"
-                f"<td>{x['Supported Releases']}</td>"
-                f"<td>{x['Status']}</td>"
+                f"<td>{x.model}</td>"
+                f"<td>{x.cpu}</td>"
+                f"<td>{x.code}</td>"
+                f"<td>{x.releases}</td>"
+                f"<td>{x.status}</td>"
+                f"{_target_cells(x.versions, targets, memo) if extra_th else ''}"
                 "</tr>"
             )
-        html.append("</tbody></table>")
-    html.append("</section>")
+        emit("</tbody></table>")
+    emit("</section>")
+
+def _render_appendix(emit, appendix, targets=(), interactive=False):
+    # Appendix counts (based on full inventory mapping)
+    inv_ok = sum(1 for r in appendix if r.status == "OK")
+    inv_blocked = sum(1 for r in appendix if r.status == "Blocked")
+    inv_total = inv_ok + inv_blocked if (inv_ok + inv_blocked) > 0 else 1
+    inv_pct_ok = f"{(inv_ok/inv_total*100):.1f}%"
 
     # Appendix — full inventory with names + PIE
-    html.append('<section id="appendix">')
-    html.append("<h2>Appendix: Full Inventory with Server Names</h2>")
-    html.append("""
+    emit('<section id="appendix">')
+    emit("<h2>Appendix: Full Inventory with Server Names</h2>")
+    emit("""
     This appendix lists the full server inventory extracted from VCF Operations, matched against the Broadcom Compatibility Guide where possible.
     The chart below summarises the percentage of servers in the inventory that support vSphere 9.0 (OK) versus those that do not (Blocked).
     """)
 
     # Inventory pie chart (SVG)
     inv_pie_svg = pie_svg_two(inv_ok, inv_blocked, size=160)
-    html.append("<div class='kpi'>")
-    html.append(inv_pie_svg)
-    html.append(f"""
+    emit("<div class='kpi'>")
+    emit(inv_pie_svg)
+    emit(f"""
       <div class="legend2" aria-label="Inventory summary">
         <div><span class="chip ok"></span> OK: <b>{inv_ok}</b> ({inv_pct_ok})</div>
         <div><span class="chip blocked"></span> Blocked: <b>{inv_blocked}</b></div>
         <div>Total in inventory: <b>{inv_ok + inv_blocked}</b></div>
       </div>
     """)
-    html.append("</div>")
+    emit("</div>")
+
+    if interactive:
+        _render_interactive_table(emit, appendix, targets)
+        emit("</section>")
+        return inv_ok, inv_blocked
 
     # Inventory table
-    html.append("<table><thead><tr>"
-                "<th>Name</th><th>Model</th><th>CPU Model</th><th>Code Name</th><th>Supported Releases</th><th>Status</th>"
-                "</tr></thead><tbody>")
+    extra_th, memo = "".join(f"<th>{label}</th>" for label, _ in targets[1:]), {}
+    emit("<table><thead><tr>"
+         f"<th>Name</th><th>Model</th><th>CPU Model</th><th>Code Name</th><th>Supported Releases</th><th>Status</th>{extra_th}"
+         "</tr></thead><tbody>")
     for r in appendix:
-        cls = "ok-row" if r["Status"] == "OK" else "blocked-row"
-        html.append(
+        cls = "ok-row" if r.status == "OK" else "blocked-row"
+        emit(
             f"<tr class='{cls}'>"
-            f"<td>{r.get('Name','')}</td>"
-            f"<td>{r.get('Model','')}</td>"
-            f"<td>{r.get('CPU Model','')}</td>"
-            f"<td>{r.get('Code Name','')}</td>"
-            f"<td>{r.get('Supported Releases','')}</td>"
-            f"<td>{r.get('Status','Blocked')}</td>"
+            f"<td>{r.name}</td>"
+            f"<td>{r.model}</td>"
+            f"<td>{r.cpu}</td>"
+            f"<td>{r.code}</td>"
+            f"<td>{r.releases}</td>"
+            f"<td>{r.status}</td>"
+            f"{_target_cells(r.versions, targets, memo) if extra_th else ''}"
             "</tr>"
         )
-    html.append("</tbody></table>")
-    html.append("</section>")
+    emit("</tbody></table>")
+    emit("</section>")
+    return inv_ok, inv_blocked
 
+def _render_footer(emit):
     # Footer
     generated_when = datetime.now().strftime('%d %B %Y, %H:%M')
-    html.append(f"""
+    emit(f"""
       <div class="footer tiny">
         Generated: {generated_when} &nbsp;|&nbsp; Generated by YOUR_NAME_OR_ORG HERE
       </div>
     """)
-    html.append("</main></div>")  # content + layout
-    html.append("</body></html>")
+    emit("</main></div>")  # content + layout
+    emit("</body></html>")
+
+def write_report(out_html, enriched, appendix, configs=(), changes=None, capacity=None):
+    """Stream the HTML report to out_html section by section. Returns the (ok, blocked) inventory counts."""
+    targets = release_targets()
+    with open(out_html, "w", encoding="utf-8", buffering=HTML_BUFFER_BYTES) as f:
+        emit = _fragment_writer(f)
+        with stage("render_head"): _render_head(emit, changes, capacity)
+        with stage("render_overview"): _render_overview(emit)
+        with stage("render_summary"): _render_summary(emit, enriched, configs, targets)
+        if capacity:
+            with stage("render_capacity"): _render_capacity(emit, capacity)
+        if changes:
+            with stage("render_changes"): _render_changes(emit, changes)
+        with stage("render_vendor_detail"): _render_vendor_detail(emit, enriched, targets)
+        with stage("render_appendix", rows=len(appendix), interactive=INTERACTIVE_APPENDIX):
+            inv_ok, inv_blocked = _render_appendix(emit, appendix, targets, INTERACTIVE_APPENDIX)
+        with stage("render_footer"): _render_footer(emit)
+    return inv_ok, inv_blocked
+
+# =========================
+# Interactive appendix
+# =========================
+# With --interactive the appendix table is not written as <tr> rows. The hosts are embedded
+# as one dictionary-encoded JSON payload (every distinct string once, rows as string ids),
+# gzip+base64 by default, and an inline script renders only the rows in view. It can sort
+# by any column and filter by status, vendor, cluster and text. The file stays
+# self-contained, like the base64 banner. Decompression uses the browser's
+# DecompressionStream.
+INTERACTIVE_APPENDIX = False
+INTERACTIVE_COMPRESS = True
+APPENDIX_FIELDS = ["Name", "Model", "CPU Model", "Code Name", "Supported Releases", "Status", "Vendor", "vCenter", "Cluster"]
+
+def appendix_payload(appendix, targets=()):
+    """{"fields": [...], "strings": [...], "rows": [string id, ...]} with len(fields) ids per host."""
+    memo, extra = {}, bool(targets[1:])
+    ids, strings, rows = {}, [], []
+    for r in appendix:
+        vals = [r.name, r.model, r.cpu, r.code, r.releases, r.status, r.vendor, r.vcenter, r.cluster]
+        if extra: vals += ["OK" if ok else "Blocked" for ok in target_flags(r.versions, targets, memo)[1:]]
+        for v in vals:
+            i = ids.get(v)
+            if i is None: i = ids[v] = len(strings); strings.append(v)
+            rows.append(i)
+    return {"fields": APPENDIX_FIELDS + [label for label, _ in targets[1:]], "strings": strings, "rows": rows}
+
+def encode_payload(payload, compress=True):
+    """(encoding, text) for a <script> data block: gzip+base64, or plain JSON with "</" escaped."""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    if not compress: return "json", data.replace("</", "<\\/")
+    return "gzip+base64", base64.b64encode(gzip.compress(data.encode("utf-8"), 6, mtime=0)).decode("ascii")
+
+def _render_interactive_table(emit, appendix, targets=()):
+    with stage("appendix_payload", rows=len(appendix)) as rec:
+        encoding, text = encode_payload(appendix_payload(appendix, targets), INTERACTIVE_COMPRESS)
+        rec.update(encoding=encoding, bytes=len(text))
+    emit("""
+    <div class="vt-tools">
+      <label>Status <select id="vt-status"><option value="">All</option></select></label>
+      <label>Vendor <select id="vt-vendor"><option value="">All</option></select></label>
+      <label>Cluster <select id="vt-cluster"><option value="">All</option></select></label>
+      <label>Search <input id="vt-search" type="search" placeholder="name, model or CPU"></label>
+      <span id="vt-count" class="tiny"></span>
+    </div>
+    <div id="vt-scroll" class="vt-scroll"><table class="vt"><thead id="vt-head"></thead><tbody id="vt-body"></tbody></table></div>
+    <noscript><p><b>Note:</b> the interactive appendix needs JavaScript; run the report without --interactive for a static table.</p></noscript>
+    """)
+    mime = "application/json" if encoding == "json" else "text/plain"
+    emit(f"<script type='{mime}' id='vt-data' data-encoding='{encoding}'>{text}</script>")
+    emit(interactive_script())
+
+def interactive_script():
+    return """
+    <style>
+      .vt-tools { display:flex; gap:14px; flex-wrap:wrap; align-items:center; margin:14px 0 6px; font-size:13px; }
+      .vt-scroll { height:70vh; overflow:auto; border:1px solid #eee; }
+      table.vt { margin-top:0; table-layout:fixed; }
+      table.vt th { position:sticky; top:0; cursor:pointer; user-select:none; z-index:1; }
+      table.vt td { height:21px; white-space:nowrap; overflow:hidden; text-overflow:ellipsis; }
+    </style>
+    <script>
+    (async function () {
+      const el = document.getElementById("vt-data");
+      let text = el.textContent;
+      if (el.dataset.encoding === "gzip+base64") {
+        const bin = Uint8Array.from(atob(text), c => c.charCodeAt(0));
+        text = await new Response(new Blob([bin]).stream().pipeThrough(new DecompressionStream("gzip"))).text();
+      }
+      const d = JSON.parse(text), S = d.strings, R = d.rows, F = d.fields.length, n = R.length / F;
+      const SHOWN = [0, 1, 2, 3, 4, 5].concat(d.fields.map((_, i) => i).slice(9));
+      const STATUS = 5, VENDOR = 6, VC = 7, CL = 8;
+      // rank of every string in natural order, so sorting compares integers
+      const coll = new Intl.Collator(undefined, {numeric: true, sensitivity: "base"});
+      const rank = new Uint32Array(S.length);
+      S.map((_, i) => i).sort((a, b) => coll.compare(S[a], S[b])).forEach((id, r) => { rank[id] = r; });
+      const esc = s => s.replace(/[&<>"']/g, c => "&#" + c.charCodeAt(0) + ";");
+      const $ = id => document.getElementById(id);
+
+      function options(sel, values) {
+        for (const [value, label] of values) { const o = document.createElement("option"); o.value = value; o.textContent = label; sel.appendChild(o); }
+      }
+      const distinct = f => { const m = new Map(); for (let i = 0; i < n; i++) m.set(R[i * F + f], 1); return [...m.keys()].sort((a, b) => rank[a] - rank[b]); };
+      options($("vt-status"), distinct(STATUS).map(id => [id, S[id]]));
+      options($("vt-vendor"), distinct(VENDOR).map(id => [id, S[id]]));
+      const clusters = new Map();
+      for (let i = 0; i < n; i++) clusters.set(R[i * F + VC] + "," + R[i * F + CL], [R[i * F + VC], R[i * F + CL]]);
+      options($("vt-cluster"), [...clusters].sort((a, b) => rank[a[1][0]] - rank[b[1][0]] || rank[a[1][1]] - rank[b[1][1]])
+        .map(([key, [vc, cl]]) => [key, (S[vc] || "(no vCenter)") + " / " + (S[cl] || "(no cluster)")]));
+
+      let view = new Uint32Array(0), sortCol = -1, sortDir = 1;
+      $("vt-head").innerHTML = "<tr>" + SHOWN.map(f => `<th data-f="${f}">${esc(d.fields[f])}</th>`).join("") + "</tr>";
+
+      function apply() {
+        const st = $("vt-status").value, ve = $("vt-vendor").value, cl = $("vt-cluster").value;
+        const q = $("vt-search").value.trim().toLowerCase();
+        const hit = q ? S.map(s => s.toLowerCase().includes(q)) : null;
+        const out = [];
+        for (let i = 0; i < n; i++) {
+          const o = i * F;
+          if (st && R[o + STATUS] != st) continue;
+          if (ve && R[o + VENDOR] != ve) continue;
+          if (cl && R[o + VC] + "," + R[o + CL] !== cl) continue;
+          if (hit && !(hit[R[o]] || hit[R[o + 1]] || hit[R[o + 2]])) continue;
+          out.push(i);
+        }
+        if (sortCol >= 0) out.sort((a, b) => (rank[R[a * F + sortCol]] - rank[R[b * F + sortCol]]) * sortDir || a - b);
+        view = Uint32Array.from(out);
+        $("vt-count").textContent = `${view.length} of ${n} hosts`;
+        $("vt-scroll").scrollTop = 0;
+        draw();
+      }
+
+      let rowH = 0, pending = false;
+      function draw() {
+        pending = false;
+        const box = $("vt-scroll"), body = $("vt-body");
+        if (!rowH) {   // measure one rendered row
+          body.innerHTML = "<tr><td>&nbsp;</td></tr>"; rowH = body.firstChild.getBoundingClientRect().height || 22;
+        }
+        const first = Math.max(0, Math.floor(box.scrollTop / rowH) - 10);
+        const last = Math.min(view.length, first + Math.ceil(box.clientHeight / rowH) + 20);
+        let html = `<tr style="height:${first * rowH}px"></tr>`;
+        for (let k = first; k < last; k++) {
+          const o = view[k] * F;
+          html += `<tr class="${S[R[o + STATUS]] === "OK" ? "ok-row" : "blocked-row"}">`
+            + SHOWN.map(f => { const s = esc(S[R[o + f]]); return `<td title="${s}">${s}</td>`; }).join("") + "</tr>";
+        }
+        body.innerHTML = html + `<tr style="height:${(view.length - last) * rowH}px"></tr>`;
+      }
+
+      $("vt-head").addEventListener("click", e => {
+        const f = +e.target.dataset.f;
+        if (Number.isNaN(f)) return;
+        sortDir = sortCol === f ? -sortDir : 1; sortCol = f;
+        for (const th of $("vt-head").querySelectorAll("th"))
+          th.textContent = d.fields[+th.dataset.f] + (+th.dataset.f === f ? (sortDir > 0 ? " ▲" : " ▼") : "");
+        apply();
+      });
+      for (const id of ["vt-status", "vt-vendor", "vt-cluster"]) $(id).addEventListener("change", apply);
+      $("vt-search").addEventListener("input", apply);
+      $("vt-scroll").addEventListener("scroll", () => { if (!pending) { pending = true; requestAnimationFrame(draw); } });
+      apply();
+    })();
+    </script>
+    """
+
+# =========================
+# Sharded report
+# =========================
+# With --shard the appendix is split into one page per vCenter or cluster, next to a light
+# index page (overview, summaries and one pie per vCenter/cluster) and a page with the HCL
+# detail. All pages link one shared stylesheet. Shard pages are rendered by a process pool
+# from plain row tuples while the parent writes the index.
+SHARD_LEVELS = ("vcenter", "cluster")
+SHARD_WORKERS = None        # None: CPU count (max BATCH_MAX_WORKERS); batch workers render shards in-process
+SHARD_CSS = "vcf9_report.css"
+SHARD_HCL_PAGE = "hcl_detail.html"
+
+def shard_dir(out_html):
+    """report_20250901.html -> report_20250901/ (index.html, one page per shard, stylesheet)."""
+    return os.path.splitext(out_html)[0]
+
+def _shard_filename(label, taken):
+    stem = re.sub(r"[^\w.-]+", "_", label).strip("_") or "shard"
+    name, n = f"{stem}.html", 2
+    while name in taken or name in ("index.html", SHARD_HCL_PAGE):
+        name = f"{stem}_{n}.html"; n += 1
+    taken.add(name)
+    return name
+
+def _render_page_head(emit, title, links, banner=False):
+    img = image_to_data_uri(HEADER_IMG) if banner else None
+    emit("<!doctype html><html><head><meta charset='utf-8'>")
+    emit(f"<title>{title}</title>")
+    emit(f"<link rel='stylesheet' href='{SHARD_CSS}'>")
+    emit("</head><body>")
+    if img: emit(f"<img class='banner' src='{img}' alt='Cover'>")
+    emit("<div class='layout'>")
+    emit('<nav class="sidebar" aria-label="Contents"><h3>Contents</h3>'
+         + "".join(f'<a href="{href}">{label}</a>' for href, label in links) + "</nav>")
+
+def _shard_pie(label, ok, blocked, href=None):
+    title = f"<a href='{href}'>{label}</a>" if href else label
+    total = ok + blocked
+    return (f"<div><div class='vendor-title'>{title}</div>{pie_svg_two(ok, blocked, size=120)}"
+            f"<div class='tiny'>OK {ok} ({(ok / total * 100 if total else 0):.1f}%) &nbsp;|&nbsp; Blocked {blocked}</div></div>")
+
+def _write_shard_page(path, title, rows, extra_labels):
+    """One shard: pie and host table. rows are (name, model, cpu, code, releases, status, extra target flags)."""
+    ok = sum(1 for r in rows if r[5] == "OK")
+    with open(path, "w", encoding="utf-8", buffering=HTML_BUFFER_BYTES) as f:
+        emit = _fragment_writer(f)
+        _render_page_head(emit, f"{title} — VCF 9.0 Hardware Compatibility",
+                          [("index.html", "Report Index"), (SHARD_HCL_PAGE, "Per-entry Detail (by Vendor)")])
+        emit("<main class='content'>")
+        emit(f"<h1>{title}</h1>")
+        emit("<div class='kpi'>")
+        emit(pie_svg_two(ok, len(rows) - ok, size=160))
+        emit(f"""
+      <div class="legend2" aria-label="Shard summary">
+        <div><span class="chip ok"></span> OK: <b>{ok}</b> ({(ok / len(rows) * 100 if rows else 0):.1f}%)</div>
+        <div><span class="chip blocked"></span> Blocked: <b>{len(rows) - ok}</b></div>
+        <div>Hosts: <b>{len(rows)}</b></div>
+      </div>
+    """)
+        emit("</div>")
+        emit("<table><thead><tr>"
+             "<th>Name</th><th>Model</th><th>CPU Model</th><th>Code Name</th><th>Supported Releases</th><th>Status</th>"
+             + "".join(f"<th>{label}</th>" for label in extra_labels) + "</tr></thead><tbody>")
+        for name, model, cpu, code, releases, status, flags in rows:
+            cls = "ok-row" if status == "OK" else "blocked-row"
+            emit(f"<tr class='{cls}'><td>{name}</td><td>{model}</td><td>{cpu}</td><td>{code}</td><td>{releases}</td><td>{status}</td>"
+                 + "".join(f"<td>{'OK' if x else 'Blocked'}</td>" for x in flags) + "</tr>")
+        emit("</tbody></table>")
+        _render_footer(emit)
+    return path
+
+def write_sharded_report(out_html, enriched, appendix, configs=(), changes=None, level="cluster", capacity=None):
+    """
+    Write shard_dir(out_html)/index.html plus one page per vCenter or cluster and the HCL
+    detail page. Returns (ok, blocked, index path).
+    """
+    folder = shard_dir(out_html)
+    os.makedirs(folder, exist_ok=True)
+    targets = release_targets()
+    extra_labels, memo = [label for label, _ in targets[1:]], {}
+    with open(os.path.join(folder, SHARD_CSS), "w", encoding="utf-8") as f:
+        f.write(css_styles().strip()[len("<style>"):-len("</style>")].strip("\n") + "\n")
+
+    with stage("shard_group", rows=len(appendix)) as rec:
+        shards = {}
+        for r in appendix:
+            vc = r.vcenter or "(no vCenter)"
+            key = (vc,) if level == "vcenter" else (vc, r.cluster or "(no cluster)")
+            flags = target_flags(r.versions, targets, memo)[1:] if extra_labels else ()
+            shards.setdefault(key, []).append((r.name, r.model, r.cpu, r.code, r.releases, r.status, flags))
+        taken, pages = set(), {}
+        for key in sorted(shards):
+            pages[key] = _shard_filename(" - ".join(key), taken)
+        rec["shards"] = len(shards)
+
+    workers = SHARD_WORKERS or min(os.cpu_count() or 1, BATCH_MAX_WORKERS)
+    jobs = [(os.path.join(folder, pages[k]), " / ".join(k), rows, extra_labels) for k, rows in shards.items()]
+    with ExitStack() as stack:
+        if workers > 1 and len(jobs) > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=min(workers, len(jobs))))
+            futures = [pool.submit(_write_shard_page, *job) for job in jobs]
+        else:
+            futures = None
+
+        # The parent writes the HCL detail page and the index while the shards render
+        with stage("render_hcl_page"), open(os.path.join(folder, SHARD_HCL_PAGE), "w", encoding="utf-8",
+                                            buffering=HTML_BUFFER_BYTES) as f:
+            emit = _fragment_writer(f)
+            _render_page_head(emit, "Per-entry Detail (by Vendor) — VCF 9.0 Hardware Compatibility",
+                              [("index.html", "Report Index")])
+            emit("<main class='content'>")
+            _render_vendor_detail(emit, enriched, targets)
+            _render_footer(emit)
+
+        counts = {k: sum(1 for r in rows if r[5] == "OK") for k, rows in shards.items()}
+        per_vc = {}
+        for k, rows in shards.items():
+            c = per_vc.setdefault(k[0], [0, 0]); c[0] += counts[k]; c[1] += len(rows) - counts[k]
+        inv_ok = sum(c[0] for c in per_vc.values()); inv_blocked = sum(c[1] for c in per_vc.values())
+
+        index = os.path.join(folder, "index.html")
+        with stage("render_index"), open(index, "w", encoding="utf-8", buffering=HTML_BUFFER_BYTES) as f:
+            emit = _fragment_writer(f)
+            links = [("#overview", "Report Overview"), ("#lifecycle", "VMware vSphere 8 Lifecycle and Upgrade Planning"),
+                     ("#summary", "Hardware Compatibility Guide Support Summary")]
+            if capacity: links.append(("#capacity", "Capacity Readiness"))
+            if changes: links.append(("#changes", "Changes Since Last Report"))
+            links.append(("#vcenters", "Inventory by vCenter"))
+            if level == "cluster": links.append(("#clusters", "Inventory by Cluster"))
+            links.append((SHARD_HCL_PAGE, "Per-entry Detail (by Vendor)"))
+            _render_page_head(emit, "VCF 9.0 Hardware Compatibility — Hardware Compatibility Guide Snapshot", links, banner=True)
+            _render_overview(emit)
+            _render_summary(emit, enriched, configs, targets)
+            if capacity: _render_capacity(emit, capacity)
+            if changes: _render_changes(emit, changes)
+            emit('<section id="vcenters">')
+            emit("<h2>Inventory by vCenter</h2>")
+            emit(f"""
+    {inv_ok + inv_blocked} hosts in {len(per_vc)} vCenter(s): <b>{inv_ok}</b> OK and <b>{inv_blocked}</b> Blocked.
+    {"Select a vCenter to see its hosts." if level == "vcenter" else "Per-cluster pages are listed below."}
+    """)
+            emit("<div class='kpi'>")
+            for vc in sorted(per_vc):
+                emit(_shard_pie(vc, *per_vc[vc], href=pages[(vc,)] if level == "vcenter" else None))
+            emit("</div>")
+            emit("</section>")
+            if level == "cluster":
+                emit('<section id="clusters">')
+                emit("<h2>Inventory by Cluster</h2>")
+                for vc in sorted(per_vc):
+                    emit(f"<h3>{vc}</h3>")
+                    emit("<div class='kpi'>")
+                    for k in sorted(k for k in shards if k[0] == vc):
+                        emit(_shard_pie(k[1], counts[k], len(shards[k]) - counts[k], href=pages[k]))
+                    emit("</div>")
+                emit("</section>")
+            _render_footer(emit)
+
+        with stage("render_shards", shards=len(jobs), workers=workers if futures else 1):
+            if futures is None:
+                for job in jobs: _write_shard_page(*job)
+            else:
+                for fut in futures: fut.result()
+    return inv_ok, inv_blocked, index
+
+def run_report(hcl, inv_file, out_html, exports=(), html=True, incremental=False, history=None, shard=None):
+    """
+    Match one inventory and write the HTML report and/or the requested exports.
+    Without HTML the hosts are streamed straight from the matcher into the export files.
+    With incremental, unchanged pairs reuse the last run's resolution and the report
+    gains a "Changes Since Last Report" section. With history, the matched hosts are
+    stored as a snapshot in the SQLite history database. With shard ("vcenter" or "cluster")
+    the HTML is split into an index page and one page per shard (see write_sharded_report).
+    """
+    prev = known = buckets = None
+    if incremental and inv_file:
+        with stage("incremental_load") as rec:
+            prev = load_inventory_state(inv_file)
+            buckets = hcl_bucket_signatures(hcl)
+            known = reusable_resolutions(prev, buckets)
+            rec.update(previous=prev is not None, reusable_pairs=len(known))
+
+    if exports:
+        with stage("export_hcl"):
+            export_records(export_paths(out_html, "hcl", exports), EXPORT_HCL_FIELDS,
+                           map(hcl_export_row, hcl["enriched"]))
+    if not html:
+        counts = {"OK": 0, "Blocked": 0}
+        hosts = {} if buckets is not None else None
+        kept = [] if history else None
+        def counted(records):
+            for r in records:
+                counts[r.status] += 1
+                if hosts is not None: hosts[r.name] = (r.model, r.cpu, r.status)
+                if kept is not None: kept.append(r)
+                yield r
+        inventory, configs = open_inventory(inv_file), {}
+        with stage("match_export", file=os.path.basename(inv_file) if inv_file else None):
+            n_hosts = export_records(export_paths(out_html, "hosts", exports), EXPORT_HOST_FIELDS,
+                                     map(host_export_row, counted(iter_host_records(hcl, inventory, configs, known, suggest=False))))
+        inventory_used = inventory[0] is not None
+        if inventory_used: _count_configs(n_hosts, configs)
+        changes = _update_incremental(hcl, inv_file, prev, buckets, configs.values(), hosts) if inventory_used else None
+        if history and inventory_used: record_inventory_history(history, inv_file, kept)
+        return {"input": inv_file, "output": None, "inventory_used": inventory_used, "hosts": n_hosts,
+                "ok": counts["OK"], "blocked": counts["Blocked"], "changes": _change_counts(changes), "error": None}
+
+    with stage("match", file=os.path.basename(inv_file) if inv_file else None):
+        m = match_inventory(hcl, inv_file, known)
+    changes = None
+    if buckets is not None and m["inventory_used"]:
+        hosts = {r.name: (r.model, r.cpu, r.status) for r in m["appendix"]}
+        changes = _update_incremental(hcl, inv_file, prev, buckets, m["configs"], hosts)
+    report = out_html       # sharded: the index page; exports stay next to out_html either way
+    with stage("render"):
+        if shard and m["inventory_used"]:
+            ok, blocked, report = write_sharded_report(out_html, hcl["enriched"], m["appendix"], m["configs"], changes, shard,
+                                                       m["capacity"])
+        else:
+            ok, blocked = write_report(out_html, hcl["enriched"], m["appendix"], m["configs"], changes, m["capacity"])
+    if exports:
+        with stage("export_hosts"):
+            export_records(export_paths(out_html, "hosts", exports), EXPORT_HOST_FIELDS,
+                           map(host_export_row, m["appendix"]))
+    if history and m["inventory_used"]: record_inventory_history(history, inv_file, m["appendix"])
+    return {"input": inv_file, "output": report, "inventory_used": m["inventory_used"], "hosts": len(m["appendix"]),
+            "ok": ok, "blocked": blocked, "changes": _change_counts(changes), "error": None}
+
+def _update_incremental(hcl, inv_file, prev, buckets, configs, hosts):
+    """Save this run's state and return the diff against the previous one (None on a first run)."""
+    if buckets is None: return None
+    with stage("incremental_save"):
+        state = build_inventory_state(hcl, buckets, configs, hosts)
+        changes = diff_inventory_state(prev, state) if prev else None
+        save_inventory_state(inv_file, state)
+    if DEBUG and changes:
+        print(f"[STATE] Since {changes['since']}: {_change_counts(changes)}")
+    return changes
+
+def _change_counts(changes):
+    if not changes: return None
+    return {k: len(changes[k]) for k in ("newly_ok", "newly_blocked", "new_hosts", "removed_hosts")}
+
+# =========================
+# History database
+# =========================
+# With --history DB every run stores the HCL export and the matched inventory as dated
+# snapshots (see vcf9_history.py for trend queries and charts). history is a small dict:
+# {"db": path, "date": "YYYY-MM-DD" or None, "hcl_snapshot": id of the HCL snapshot}.
+def record_hcl_history(db, hcl_file, enriched, date=None):
+    import vcf9_history
+    with stage("history_hcl", rows=len(enriched)):
+        conn = vcf9_history.connect(db)
+        try:
+            sid, inserted = vcf9_history.ingest_hcl(conn, os.path.abspath(hcl_file), file_fingerprint(hcl_file)["sha256"],
+                                                    enriched, norm_model, norm_cpu, date)
+        finally: conn.close()
+    if DEBUG: print(f"[HISTORY] HCL snapshot {sid}", "stored" if inserted else "already stored")
+    return sid
+
+def record_inventory_history(history, inv_file, hosts):
+    import vcf9_history
+    with stage("history_inventory", rows=len(hosts)):
+        conn = vcf9_history.connect(history["db"])
+        try:
+            sid, inserted = vcf9_history.ingest_inventory(
+                conn, inventory_source(inv_file), None if is_ops_url(inv_file) else file_fingerprint(inv_file)["sha256"],
+                ((r.name, r.model, r.cpu, r.status, r.vendor, r.match) for r in hosts),
+                norm_model, norm_cpu, history.get("hcl_snapshot"), history.get("date"))
+        finally: conn.close()
+    if DEBUG: print(f"[HISTORY] Inventory snapshot {sid}", "stored" if inserted else "already stored")
+    return sid
+
+# =========================
+# Batch mode
+# =========================
+# One HCL index is built (or loaded from cache) in the parent and handed to each worker
+# once via the pool initializer; every inventory is matched and rendered independently.
+BATCH_MAX_WORKERS = 8
+_BATCH_HCL = None
+
+def expand_batch_inputs(paths):
+    """
+    Files are taken as-is; directories contribute every Host Inventory CSV they contain and
+    discovery manifests (--manifest) every inventory they list, without re-checking them.
+    """
+    files = []
+    for p in paths:
+        inputs = read_manifest(p) if p.lower().endswith(".json") else None
+        if inputs is not None:
+            files.extend(f["path"] for f in inputs if f.get("kind") == "inventory")
+        elif is_ops_url(p):
+            files.append(p)
+        elif os.path.isdir(p):
+            files.extend(os.path.join(p, f) for f in sorted(os.listdir(p)) if is_inventory_filename(f))
+        elif os.path.isfile(p):
+            files.append(p)
+        else:
+            print("[WARN] Batch input not found:", p)
+    return list(dict.fromkeys(inventory_source(f) for f in files))
+
+def manifest_hcl_file(paths):
+    """Newest HCL export listed in the discovery manifests among batch inputs, or None."""
+    found = []
+    for p in paths:
+        inputs = read_manifest(p) if p.lower().endswith(".json") else None
+        if inputs: found.extend(f for f in inputs if f.get("kind") == "hcl")
+    return next((f["path"] for f in pick_inputs(found, "hcl")), None)
+
+def batch_output_path(inv_file, out_dir, taken):
+    base = urlsplit(inv_file).netloc if is_ops_url(inv_file) else os.path.splitext(os.path.basename(inv_file))[0]
+    stem = re.sub(r"[^\w.-]+", "_", base).strip("_") or "inventory"
+    name = f"{stem}_vcf9_cpu_support_report_{datetime.now().strftime('%Y%m%d')}.html"
+    n = 2
+    while name in taken:
+        name = f"{stem}_{n}_vcf9_cpu_support_report_{datetime.now().strftime('%Y%m%d')}.html"; n += 1
+    taken.add(name)
+    return os.path.join(out_dir, name)
+
+def _batch_init(hcl, header_img, debug, targets, interactive=False):
+    global _BATCH_HCL, HEADER_IMG, DEBUG, EXTRA_RELEASE_TARGETS, SHARD_WORKERS, INTERACTIVE_APPENDIX
+    _BATCH_HCL, HEADER_IMG, DEBUG, EXTRA_RELEASE_TARGETS = hcl, header_img, debug, targets
+    INTERACTIVE_APPENDIX = interactive
+    SHARD_WORKERS = 1       # already one process per inventory
+
+def _batch_job(inv_file, out_html, exports, html, incremental, history, shard):
+    try:
+        return run_report(_BATCH_HCL, inv_file, out_html, exports, html, incremental, history, shard)
+    except Exception as e:
+        return {"input": inv_file, "output": None, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(hcl, inv_files, out_dir, workers=None, exports=(), html=True, incremental=False, history=None, shard=None):
+    os.makedirs(out_dir, exist_ok=True)
+    taken = set()
+    jobs = [(f, batch_output_path(f, out_dir, taken)) for f in inv_files]
+    workers = max(1, min(workers or min(os.cpu_count() or 1, BATCH_MAX_WORKERS), len(jobs)))
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_batch_init,
+                             initargs=(hcl, HEADER_IMG, DEBUG, EXTRA_RELEASE_TARGETS, INTERACTIVE_APPENDIX)) as pool:
+        futures = {pool.submit(_batch_job, f, out, exports, html, incremental, history, shard): f for f, out in jobs}
+        for fut in as_completed(futures):
+            f = futures[fut]
+            try: res = fut.result()
+            except Exception as e:  # worker process died (e.g. BrokenProcessPool)
+                res = {"input": f, "output": None, "error": f"{type(e).__name__}: {e}"}
+            results[f] = res
+            if res.get("error"): print("[BATCH] FAILED", f, "-", res["error"])
+            elif not res["inventory_used"]: print("[BATCH] SKIPPED", f, "-", BATCH_SKIPPED_NOTE)
+            elif DEBUG: print("[BATCH] Done", f, "->", res["output"] or "exports only")
+    return [results[f] for f, _ in jobs]
+
+# An unusable inventory still gets a report of the HCL rows, but its counts are HCL entries,
+# not hosts, so the summaries list it as skipped and leave it out of the totals.
+BATCH_SKIPPED_NOTE = "inventory not usable - HCL rows only"
+
+def batch_outcome(r):
+    if r.get("error"): return "failed"
+    return "ok" if r["inventory_used"] else "skipped"
+
+def write_batch_summary(results, out_dir):
+    path = os.path.join(out_dir, f"vcf9_batch_summary_{datetime.now().strftime('%Y%m%d')}.csv")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Input", "Report", "Hosts", "OK", "Blocked", "OK %", "Error"])
+        for r in results:
+            outcome = batch_outcome(r)
+            if outcome == "failed":
+                w.writerow([r["input"], "", "", "", "", "", r["error"]]); continue
+            if outcome == "skipped":
+                w.writerow([r["input"], r["output"] or "", "", "", "", "", f"skipped: {BATCH_SKIPPED_NOTE}"]); continue
+            total = r["ok"] + r["blocked"]
+            w.writerow([r["input"], r["output"], r["hosts"], r["ok"], r["blocked"],
+                        f"{(r['ok']/total*100 if total else 0):.1f}%", ""])
+    return path
+
+def print_batch_summary(results):
+    print(f"{'OK':>7} {'Blocked':>8}  Input")
+    tally = {"ok": 0, "skipped": 0, "failed": 0}
+    for r in results:
+        outcome = batch_outcome(r); tally[outcome] += 1
+        if outcome == "failed": print(f"{'-':>7} {'-':>8}  {r['input']}  [FAILED: {r['error']}]")
+        elif outcome == "skipped": print(f"{'-':>7} {'-':>8}  {r['input']}  [SKIPPED: {BATCH_SKIPPED_NOTE}]")
+        else: print(f"{r['ok']:>7} {r['blocked']:>8}  {r['input']}")
+    done = [r for r in results if batch_outcome(r) == "ok"]
+    print(f"{sum(r['ok'] for r in done):>7} {sum(r['blocked'] for r in done):>8}  "
+          f"TOTAL ({tally['ok']} ok, {tally['skipped']} skipped, {tally['failed']} failed)")
+
+# =========================
+# Watch mode
+# =========================
+# --watch polls HCL_DIR and INV_SEARCH_DIRS and waits until a burst of writes has been quiet
+# for WATCH_DEBOUNCE seconds. It then re-renders only the reports whose inventory changed, or
+# all of them when the HCL export changed. The HCL dataset stays loaded between runs. With
+# --serve the latest reports are kept in memory and served with ETag/Last-Modified, so
+# dashboards polling the endpoint never trigger a render.
+WATCH_INTERVAL = 2.0
+WATCH_DEBOUNCE = 5.0
+
+def scan_watch_inputs():
+    """{path: (kind, size, mtime_ns)} for Systems*.csv in HCL_DIR and Host Inventory CSVs in INV_SEARCH_DIRS."""
+    found = {}
+    for folder, kind, wanted in [(HCL_DIR, "hcl", is_hcl_filename)] + [(d, "inventory", is_inventory_filename) for d in INV_SEARCH_DIRS]:
+        try:
+            with os.scandir(folder) as it:
+                for e in it:
+                    if wanted(e.name) and e.is_file():
+                        st = e.stat()
+                        found[os.path.abspath(e.path)] = (kind, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            continue
+    return found
+
+def newest_watch_hcl(seen):
+    """The Systems*.csv among scan_watch_inputs() results that a run would use: newest by mtime."""
+    found = [{"kind": kind, "path": p, "mtime_ns": mtime} for p, (kind, _, mtime) in seen.items()]
+    return next((f["path"] for f in pick_inputs(found, "hcl")), None)
+
+class ReportStore:
+    """Latest rendered reports, served from memory. Entries are replaced whole, never mutated."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reports = {}     # url name -> {"body", "etag", "mtime", "inventory", "result"}
+        self.pages = {}       # "/" and "/status.json" -> (body, etag, mtime, content type)
+
+    def publish(self, inv_file, out_html, result):
+        body = mtime = None
+        if result.get("output"):
+            with open(out_html, "rb") as f: body = f.read()
+            mtime = os.stat(out_html).st_mtime
+        entry = {"body": body, "etag": f'"{hashlib.sha1(body).hexdigest()[:20]}"' if body else None,
+                 "mtime": mtime or time.time(), "inventory": inv_file, "result": result}
+        with self.lock:
+            self.reports[os.path.basename(out_html)] = entry
+            self._refresh_pages()
+
+    def remove(self, out_html):
+        with self.lock:
+            if self.reports.pop(os.path.basename(out_html), None) is not None: self._refresh_pages()
+
+    def _refresh_pages(self):
+        now = time.time()
+        status = [{"report": f"/reports/{name}" if e["body"] else None, "inventory": e["inventory"],
+                   "generated": datetime.fromtimestamp(e["mtime"]).isoformat(timespec="seconds"),
+                   **{k: e["result"].get(k) for k in ("hosts", "ok", "blocked", "changes", "error")}}
+                  for name, e in sorted(self.reports.items())]
+        body = json.dumps(status, indent=2).encode("utf-8")
+        self.pages["/status.json"] = (body, f'"{hashlib.sha1(body).hexdigest()[:20]}"', now, "application/json")
+        rows = []
+        for r in status:
+            link = f"<a href='{r['report']}'>{os.path.basename(r['report'])}</a>" if r["report"] else "exports only"
+            cells = f"<td>{r['error']}</td><td></td><td></td>" if r["error"] else \
+                    f"<td>{r['hosts']}</td><td>{r['ok']}</td><td>{r['blocked']}</td>"
+            rows.append(f"<tr><td>{link}</td><td>{r['inventory']}</td><td>{r['generated']}</td>{cells}</tr>")
+        body = ("<!doctype html><html><head><meta charset='utf-8'><title>VCF 9.0 Hardware Compatibility — Reports</title>"
+                + css_styles() + "</head><body><main class='content'><h1>VCF 9.0 Hardware Compatibility — Reports</h1>"
+                "<table><thead><tr><th>Report</th><th>Inventory</th><th>Generated</th><th>Hosts</th><th>OK</th><th>Blocked</th>"
+                "</tr></thead><tbody>" + "".join(rows) + "</tbody></table></main></body></html>").encode("utf-8")
+        self.pages["/"] = (body, f'"{hashlib.sha1(body).hexdigest()[:20]}"', now, "text/html; charset=utf-8")
+
+    def lookup(self, path):
+        with self.lock:
+            if path in ("/", "/index.html"): return self.pages.get("/")
+            if path in self.pages: return self.pages[path]
+            if path.startswith("/reports/"):
+                e = self.reports.get(unquote(path[len("/reports/"):]))
+                if e and e["body"]: return e["body"], e["etag"], e["mtime"], "text/html; charset=utf-8"
+        return None
+
+class _ReportHandler(BaseHTTPRequestHandler):
+    server_version = "vcf9-report"
+
+    def log_message(self, fmt, *args):
+        if DEBUG: super().log_message(fmt, *args)
+
+    def _not_modified(self, etag, mtime):
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            return inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))
+        ims = self.headers.get("If-Modified-Since")
+        if ims:
+            try: return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError): return False
+        return False
+
+    def do_GET(self, head=False):
+        page = self.server.store.lookup(urlsplit(self.path).path)
+        if page is None:
+            self.send_error(404); return
+        body, etag, mtime, ctype = page
+        status = 304 if self._not_modified(etag, mtime) else 200
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.send_header("Cache-Control", "no-cache")
+        if status == 304:
+            self.end_headers(); return
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head: self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+def start_report_server(address, store):
+    host, _, port = address.rpartition(":")
+    srv = ThreadingHTTPServer((host or "127.0.0.1", int(port)), _ReportHandler)
+    srv.daemon_threads = True
+    srv.store = store
+    threading.Thread(target=srv.serve_forever, name="vcf9-report-server", daemon=True).start()
+    print(f"[SERVE] Reports at http://{srv.server_address[0]}:{srv.server_address[1]}/")
+    return srv
+
+def watch_reports(hcl_file, hcl, out_dir, use_cache=True, exports=(), html=True, incremental=False,
+                  history=None, serve=None):
+    os.makedirs(out_dir, exist_ok=True)
+    store = ReportStore()
+    server = start_report_server(serve, store) if serve else None
+    outputs, taken = {}, set()
+    seen = scan_watch_inputs()
+    pending = {p for p, (kind, *_) in seen.items() if kind == "inventory"}
+    hcl_changed, last_change = set(), float("-inf")     # the first pass renders straight away
+    newest = newest_watch_hcl(seen)
+    if newest is not None and newest != os.path.abspath(hcl_file):
+        hcl_changed.add(newest)                         # started on an older export: switch before rendering
+    print("[WATCH] Watching", HCL_DIR, "and", ", ".join(INV_SEARCH_DIRS), "- Ctrl+C to stop")
+    try:
+        while True:
+            if (pending or hcl_changed) and time.monotonic() - last_change >= WATCH_DEBOUNCE:
+                if hcl_changed:
+                    new_file = newest_watch_hcl(seen)
+                    if new_file is None:
+                        print("[WARN] No Systems*.csv left in", HCL_DIR, "- keeping the loaded HCL")
+                    elif new_file != os.path.abspath(hcl_file) or new_file in hcl_changed:
+                        try:
+                            with stage("hcl_load", cache=use_cache):
+                                hcl_file, hcl = new_file, load_hcl_dataset(new_file, use_cache=use_cache)
+                        except (HclError, OSError) as e:
+                            print("[WARN] Could not load", new_file, "- keeping the loaded HCL:", e)
+                        else:
+                            if history:
+                                history["hcl_snapshot"] = record_hcl_history(history["db"], hcl_file, hcl["enriched"], history["date"])
+                            print("[WATCH] HCL reloaded from", hcl_file)
+                            pending |= {p for p, (kind, *_) in seen.items() if kind == "inventory"}
+                    hcl_changed = set()
+                for inv in sorted(pending):
+                    if inv not in outputs: outputs[inv] = batch_output_path(inv, out_dir, taken)
+                    if inv not in seen:
+                        store.remove(outputs[inv]); print("[WATCH] Inventory removed:", inv); continue
+                    t0 = time.perf_counter()
+                    try:
+                        res = run_report(hcl, inv, outputs[inv], exports, html, incremental, history)
+                    except Exception as e:
+                        res = {"input": inv, "output": None, "error": f"{type(e).__name__}: {e}"}
+                        print("[WATCH] FAILED", inv, "-", res["error"])
+                    else:
+                        print(f"[WATCH] {os.path.basename(inv)}: {res['ok']} OK, {res['blocked']} Blocked "
+                              f"({time.perf_counter() - t0:.1f}s) -> {res['output'] or 'exports only'}")
+                    store.publish(inv, outputs[inv], res)
+                pending = set()
+            time.sleep(WATCH_INTERVAL)
+            current = scan_watch_inputs()
+            changed = {p: (current.get(p) or seen[p])[0] for p in current.keys() | seen.keys() if current.get(p) != seen.get(p)}
+            seen = current
+            if changed:
+                last_change = time.monotonic()
+                for p, kind in changed.items():
+                    if kind == "hcl": hcl_changed.add(p)
+                    else: pending.add(p)
+    except KeyboardInterrupt:
+        print("[WATCH] Stopped")
+    finally:
+        if server is not None: server.shutdown(); server.server_close()
+
+# =========================
+# Main
+# =========================
+def parse_export_formats(value):
+    formats = tuple(dict.fromkeys(f.strip().lower() for f in value.split(",") if f.strip()))
+    bad = [f for f in formats if f not in EXPORT_FORMATS]
+    if bad or not formats:
+        raise argparse.ArgumentTypeError(f"unknown export format(s): {', '.join(bad) or value!r} (use jsonl, csv)")
+    return formats
+
+def parse_release_targets(value):
+    labels = [t.strip() for t in value.split(",") if t.strip()]
+    bad = [t for t in labels if parse_target(t) is None]
+    if bad or not labels:
+        raise argparse.ArgumentTypeError(f"not an ESXi release: {', '.join(bad) or value!r} (e.g. 'ESXi 8.0 U3,ESXi 9.1')")
+    return labels
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="VCF 9.0 hardware compatibility report from a Broadcom HCL export.")
+    ap.add_argument("--check-relaxed", action="store_true",
+                    help="compare the relaxed-match index with a linear scan of the HCL, then exit")
+    ap.add_argument("--no-cache", action="store_true", help="rebuild the HCL index without reading or writing the cache")
+    ap.add_argument("--purge-cache", action="store_true", help="delete cached HCL indexes before running")
+    ap.add_argument("--discover", nargs="+", metavar="ROOT",
+                    help="search these folder trees (in parallel) for Systems*.csv and Host Inventory CSVs instead of HCL_DIR/INV_SEARCH_DIRS")
+    ap.add_argument("--include", action="append", default=[], metavar="GLOB", help="with --discover, only keep matching files (repeatable)")
+    ap.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="with --discover, skip matching files and folders (repeatable)")
+    ap.add_argument("--pick", choices=("newest", "all"), default="newest",
+                    help="with --discover, report on the newest inventory or on all of them as a batch (the newest HCL is always used)")
+    ap.add_argument("--manifest", metavar="JSON", help="with --discover, write the discovered inputs to JSON (usable as a --batch input)")
+    ap.add_argument("--ops", metavar="URL", help="fetch the inventory from a VCF Operations API instead of a CSV")
+    ap.add_argument("--batch", nargs="+", metavar="PATH",
+                    help="inventory CSVs, folders of them or Operations URLs to report on in parallel, one HTML per input")
+    ap.add_argument("--workers", type=int, help=f"batch / shard worker processes (default: CPU count, max {BATCH_MAX_WORKERS})")
+    ap.add_argument("--shard", choices=SHARD_LEVELS,
+                    help="split the report into an index page and one page per vCenter or cluster (in a folder named after the report)")
+    ap.add_argument("--out-dir", help="batch/watch output folder (default: BASE_DIR)")
+    ap.add_argument("--watch", action="store_true",
+                    help="keep running: re-render the affected reports whenever HCL or inventory CSVs change")
+    ap.add_argument("--serve", metavar="[HOST:]PORT", help="with --watch, serve the latest reports over HTTP (default host 127.0.0.1)")
+    ap.add_argument("--export", metavar="FORMATS", type=parse_export_formats, default=(),
+                    help="also write host and HCL records as 'jsonl', 'csv' or 'jsonl,csv' next to the report")
+    ap.add_argument("--no-html", action="store_true", help="skip the HTML report (requires --export)")
+    ap.add_argument("--interactive", action="store_true",
+                    help="embed the appendix as compressed JSON with a sortable, filterable virtual-scrolling table")
+    ap.add_argument("--targets", metavar="RELEASES", type=parse_release_targets,
+                    help="extra release targets besides ESXi 9.0, e.g. 'ESXi 8.0 U3,ESXi 9.1' (adds per-target columns)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="reuse the last run's matches for unchanged hosts/HCL entries and report what changed since then")
+    ap.add_argument("--history", metavar="DB", help="store this run's HCL and inventory snapshots in a SQLite history database")
+    ap.add_argument("--snapshot-date", metavar="YYYY-MM-DD", help="with --history, date the snapshots (default: today)")
+    ap.add_argument("--profile", metavar="JSON", help="write per-stage timings, row counts and tracemalloc peaks to JSON")
+    ap.add_argument("--profile-no-memory", action="store_true", help="with --profile, skip tracemalloc (timings only)")
+    ap.add_argument("--cprofile", metavar="FILE", help="also dump cProfile stats (pstats format) to FILE")
+    args = ap.parse_args(argv)
+    if args.no_html and not args.export: ap.error("--no-html needs --export")
+    if args.ops and not is_ops_url(args.ops): ap.error("--ops needs an http(s) URL")
+    if args.watch and (args.batch or args.ops): ap.error("--watch works on HCL_DIR and INV_SEARCH_DIRS; drop --batch/--ops")
+    if (args.include or args.exclude or args.manifest or args.pick != "newest") and not args.discover:
+        ap.error("--include/--exclude/--pick/--manifest need --discover")
+    if args.discover and (args.batch or args.ops or args.watch): ap.error("--discover cannot be combined with --batch/--ops/--watch")
+    if args.shard and (args.watch or args.no_html): ap.error("--shard cannot be combined with --watch/--no-html")
+    if args.interactive and (args.shard or args.no_html): ap.error("--interactive cannot be combined with --shard/--no-html")
+    if args.serve and not args.watch: ap.error("--serve needs --watch")
+    if args.serve and not args.serve.rpartition(":")[2].isdigit(): ap.error("--serve expects PORT or HOST:PORT")
+    if args.ops and args.batch: ap.error("--ops cannot be combined with --batch (list the URL as a batch input instead)")
+    if args.snapshot_date and not args.history: ap.error("--snapshot-date needs --history")
+    if args.snapshot_date:
+        try: datetime.strptime(args.snapshot_date, "%Y-%m-%d")
+        except ValueError: ap.error(f"--snapshot-date must be YYYY-MM-DD, not {args.snapshot_date!r}")
+    return args
+
+def main(argv=None):
+    global PROFILE
+    args = parse_args(argv)
+    if args.profile:
+        PROFILE = Profiler(memory=not args.profile_no_memory)
+        PROFILE.start()
+    if args.cprofile:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        _run(args)
+    finally:
+        if args.cprofile:
+            prof.disable(); prof.dump_stats(args.cprofile)
+            print("cProfile stats written to:\n ", args.cprofile)
+        if PROFILE is not None:
+            with open(args.profile, "w", encoding="utf-8") as f: json.dump(PROFILE.report(), f, indent=2)
+            print("Profile written to:\n ", args.profile)
+
+def _run(args):
+    global EXTRA_RELEASE_TARGETS, SHARD_WORKERS, INTERACTIVE_APPENDIX
+    if args.targets: EXTRA_RELEASE_TARGETS = args.targets
+    if args.workers: SHARD_WORKERS = args.workers
+    if args.interactive: INTERACTIVE_APPENDIX = True
+    if args.purge_cache:
+        n = purge_hcl_cache()
+        print(f"[CACHE] Purged {n} cached HCL index file(s) from", CACHE_DIR)
+
+    # Find input files
+    discovered = None
+    if args.discover:
+        discovered = discover_inputs(args.discover, args.include, args.exclude)
+        if args.manifest:
+            write_manifest(args.manifest, discovered, args.discover, args.include, args.exclude)
+            print("Manifest written to:\n ", args.manifest)
+        hcl_file = next((f["path"] for f in pick_inputs(discovered, "hcl")), None)
+        if DEBUG and hcl_file: print("[HCL] Using newest:", hcl_file)
+    elif args.batch and manifest_hcl_file(args.batch):
+        # a manifest's batch runs against the HCL export it was discovered with
+        hcl_file = manifest_hcl_file(args.batch)
+        if not os.path.isfile(hcl_file):
+            print("[ERROR] HCL export listed in the batch manifest no longer exists:", hcl_file); sys.exit(1)
+        if DEBUG: print("[HCL] Using newest from manifest:", hcl_file)
+    else:
+        with stage("discover_hcl"):
+            hcl_file = find_hcl_file()
+    if not hcl_file:
+        print("[ERROR] Could not find Systems*.csv in", ", ".join(args.discover) if args.discover else HCL_DIR)
+        sys.exit(1)
+
+    # HCL dataset (enriched rows + lookup index), from cache when the export is unchanged
+    try:
+        with stage("hcl_load", cache=not args.no_cache):
+            hcl = load_hcl_dataset(hcl_file, use_cache=not args.no_cache)
+    except HclError as e:
+        print("[ERROR]", e); sys.exit(1)
+
+    if args.check_relaxed:
+        try: n = check_relaxed_index(hcl)
+        except AssertionError as e: print("[ERROR]", e); sys.exit(1)
+        print(f"[CHECK] Relaxed index matches the linear scan on {n} lookups"); return
+
+    history = None
+    if args.history:
+        history = {"db": os.path.abspath(args.history), "date": args.snapshot_date}
+        history["hcl_snapshot"] = record_hcl_history(history["db"], hcl_file, hcl["enriched"], args.snapshot_date)
 
-    with open(OUT_HTML, "w", encoding="utf-8") as f:
-        f.write("\n".join(html))
-    print("Report written to:\n ", OUT_HTML)
+    if args.watch:
+        watch_reports(hcl_file, hcl, args.out_dir or BASE_DIR, use_cache=not args.no_cache, exports=args.export,
+                      html=not args.no_html, incremental=args.incremental, history=history, serve=args.serve)
+        return
+
+    inv_files = None
+    if args.batch:
+        inv_files = expand_batch_inputs(args.batch)
+    elif discovered is not None and args.pick == "all":
+        inv_files = [f["path"] for f in pick_inputs(discovered, "inventory", "all")]
+    if inv_files is not None:
+        if not inv_files:
+            print("[ERROR] No inventory CSVs found in batch inputs."); sys.exit(1)
+        out_dir = args.out_dir or BASE_DIR
+        results = run_batch(hcl, inv_files, out_dir, workers=args.workers, exports=args.export,
+                            html=not args.no_html, incremental=args.incremental, history=history, shard=args.shard)
+        print_batch_summary(results)
+        print("Batch summary written to:\n ", write_batch_summary(results, out_dir))
+        if any(r.get("error") for r in results): sys.exit(2)
+        return
+
+    ops_errors = ()
+    if args.ops:
+        import vcf9_ops_collector
+        inv_file, ops_errors = args.ops, vcf9_ops_collector.OpsError
+    elif discovered is not None:
+        inv_file = next((f["path"] for f in pick_inputs(discovered, "inventory")), None)
+        if DEBUG and inv_file: print("[INV] Using newest:", inv_file)
+    else:
+        with stage("discover_inventory"):
+            inv_file = find_inventory_file()
+    try:
+        res = run_report(hcl, inv_file, OUT_HTML, exports=args.export, html=not args.no_html,
+                         incremental=args.incremental, history=history, shard=args.shard)
+    except ops_errors as e:
+        print("[ERROR] Could not fetch the inventory from VCF Operations:", e)
+        sys.exit(1)
+    if not args.no_html: print("Report written to:\n ", res["output"])
+    for kind in ("hosts", "hcl"):
+        for path in export_paths(OUT_HTML, kind, args.export).values(): print("Export written to:\n ", path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite history of HCL exports and matched inventory snapshots for vcf9_cpu_support_report.py.
+
+Snapshots are ingested in bulk transactions (from the report with --history DB, or here with
+ingest-hcl), and trends are queried without re-parsing old CSVs:
+
+    python3 vcf9_history.py --db history.sqlite snapshots
+    python3 vcf9_history.py --db history.sqlite vendor-trend --last 12
+    python3 vcf9_history.py --db history.sqlite cpu-listed "Intel Xeon Gold 6526Y" [--model "..."]
+    python3 vcf9_history.py --db history.sqlite render-trend --out trend.html
+    python3 vcf9_history.py --db history.sqlite ingest-hcl "Systems_2025-06.csv" --date 2025-06-30
+"""
+
+import os, sys, sqlite3, argparse
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id            INTEGER PRIMARY KEY,
+    kind          TEXT NOT NULL CHECK (kind IN ('hcl', 'inventory')),
+    source        TEXT NOT NULL,
+    snapshot_date TEXT NOT NULL,            -- YYYY-MM-DD
+    ingested_at   TEXT NOT NULL,
+    sha256        TEXT,
+    hcl_snapshot  INTEGER REFERENCES snapshots(id),
+    rows          INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_kind_date ON snapshots(kind, snapshot_date);
+-- an inventory re-matched against another HCL snapshot is a new snapshot
+DROP INDEX IF EXISTS ux_snapshots_content;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_snapshots_content_hcl ON snapshots(kind, source, sha256, snapshot_date, hcl_snapshot);
+
+CREATE TABLE IF NOT EXISTS hcl_entries (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    model TEXT, cpu TEXT, code_name TEXT, releases TEXT, status TEXT, vendor TEXT,
+    norm_model TEXT, norm_cpu TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_hcl_snapshot ON hcl_entries(snapshot_id);
+CREATE INDEX IF NOT EXISTS ix_hcl_norm ON hcl_entries(norm_model, norm_cpu);
+CREATE INDEX IF NOT EXISTS ix_hcl_cpu_status ON hcl_entries(norm_cpu, status);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    name TEXT, model TEXT, cpu TEXT, status TEXT, vendor TEXT, match TEXT,
+    norm_model TEXT, norm_cpu TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_hosts_snapshot_vendor ON hosts(snapshot_id, vendor, status);
+CREATE INDEX IF NOT EXISTS ix_hosts_norm ON hosts(norm_model, norm_cpu);
+"""
+
+# =========================
+# Store
+# =========================
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _snapshot_date(date):
+    if not date: return datetime.now().strftime("%Y-%m-%d")
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+def _existing(conn, kind, source, sha256, date, hcl_snapshot=None):
+    if not sha256: return None
+    row = conn.execute("SELECT id FROM snapshots WHERE kind=? AND source=? AND sha256=? AND snapshot_date=? "
+                       "AND hcl_snapshot IS ?", (kind, source, sha256, date, hcl_snapshot)).fetchone()
+    return row[0] if row else None
+
+def ingest_hcl(conn, source, sha256, enriched, norm_model, norm_cpu, date=None):
+    """
+    Store one HCL export (HclEntry-like rows). Re-ingesting the same file content for the
+    same date returns the existing snapshot id. Returns (snapshot_id, inserted).
+    """
+    date = _snapshot_date(date)
+    sid = _existing(conn, "hcl", source, sha256, date)
+    if sid is not None: return sid, False
+    with conn:
+        cur = conn.execute("INSERT INTO snapshots(kind, source, snapshot_date, ingested_at, sha256, rows) "
+                           "VALUES ('hcl', ?, ?, ?, ?, ?)",
+                           (source, date, datetime.now().isoformat(timespec="seconds"), sha256, len(enriched)))
+        sid = cur.lastrowid
+        conn.executemany("INSERT INTO hcl_entries VALUES (?,?,?,?,?,?,?,?,?)",
+                         ((sid, x.model, x.cpu, x.code, x.releases, x.status, x.vendor,
+                           norm_model(x.model), norm_cpu(x.cpu)) for x in enriched))
+    return sid, True
+
+def ingest_inventory(conn, source, sha256, hosts, norm_model, norm_cpu, hcl_snapshot=None, date=None):
+    """
+    Store one matched inventory snapshot. hosts yields (name, model, cpu, status, vendor, match).
+    Re-ingesting the same file content for the same date and HCL snapshot returns the existing
+    snapshot id; matching it against a different HCL snapshot stores a new one.
+    Returns (snapshot_id, inserted).
+    """
+    date = _snapshot_date(date)
+    sid = _existing(conn, "inventory", source, sha256, date, hcl_snapshot)
+    if sid is not None: return sid, False
+    with conn:
+        cur = conn.execute("INSERT INTO snapshots(kind, source, snapshot_date, ingested_at, sha256, hcl_snapshot) "
+                           "VALUES ('inventory', ?, ?, ?, ?, ?)",
+                           (source, date, datetime.now().isoformat(timespec="seconds"), sha256, hcl_snapshot))
+        sid = cur.lastrowid
+        n = [0]
+        def rows():
+            for name, model, cpu, status, vendor, match in hosts:
+                n[0] += 1
+                yield (sid, name, model, cpu, status, vendor, match, norm_model(model), norm_cpu(cpu))
+        conn.executemany("INSERT INTO hosts VALUES (?,?,?,?,?,?,?,?,?)", rows())
+        conn.execute("UPDATE snapshots SET rows=? WHERE id=?", (n[0], sid))
+    return sid, True
+
+# =========================
+# Queries
+# =========================
+def list_snapshots(conn):
+    return conn.execute("SELECT id, kind, snapshot_date, rows, source FROM snapshots "
+                        "ORDER BY snapshot_date, id").fetchall()
+
+def vendor_trend(conn, last=12, source=None):
+    """
+    OK/Blocked host counts per vendor for the last N inventory snapshots.
+    Returns [(snapshot_id, snapshot_date, source, vendor, ok, total)] oldest first.
+    """
+    where, params = "kind='inventory'", []
+    if source: where += " AND source=?"; params.append(source)
+    params.append(last)
+    return conn.execute(f"""
+        WITH s AS (SELECT id, snapshot_date, source FROM snapshots WHERE {where}
+                   ORDER BY snapshot_date DESC, id DESC LIMIT ?)
+        SELECT s.id, s.snapshot_date, s.source, h.vendor, SUM(h.status = 'OK'), COUNT(*)
+        FROM s JOIN hosts h ON h.snapshot_id = s.id
+        GROUP BY s.id, h.vendor
+        ORDER BY s.snapshot_date, s.id, h.vendor""", params).fetchall()
+
+def cpu_listing_history(conn, cpu, model=None):
+    """
+    Per HCL snapshot, whether a normalised CPU (optionally on one model) was listed and
+    whether any of those entries was ESXi 9.0 installable (status OK).
+    Returns [(snapshot_date, source, listed_entries, ok_entries)] oldest first.
+    """
+    where, params = "e.norm_cpu = ?", [cpu]
+    if model: where += " AND e.norm_model = ?"; params.append(model)
+    return conn.execute(f"""
+        SELECT s.snapshot_date, s.source, COUNT(*), SUM(e.status = 'OK')
+        FROM hcl_entries e JOIN snapshots s ON s.id = e.snapshot_id
+        WHERE {where}
+        GROUP BY s.id ORDER BY s.snapshot_date, s.id""", params).fetchall()
+
+def first_ok_date(history):
+    return next((date for date, _, _, ok in history if ok), None)
+
+# =========================
+# Trend chart
+# =========================
+def trend_svg(points, width=560, height=160, colors=("var(--blue)", "var(--red)")):
+    """Stacked OK/Blocked share per snapshot, drawn like pie_svg_two (same colours, plain SVG)."""
+    n = max(len(points), 1)
+    pad, label_h = 4, 16
+    bar_w = (width - pad * (n + 1)) / n
+    plot_h = height - label_h
+    parts = []
+    for i, (label, ok, total) in enumerate(points):
+        x = pad + i * (bar_w + pad)
+        ok_h = plot_h * (ok / total) if total else 0
+        if total - ok > 0:
+            parts.append(f"<rect x='{x:.2f}' y='0' width='{bar_w:.2f}' height='{plot_h - ok_h:.2f}' fill='{colors[1]}'/>")
+        if ok > 0:
+            parts.append(f"<rect x='{x:.2f}' y='{plot_h - ok_h:.2f}' width='{bar_w:.2f}' height='{ok_h:.2f}' fill='{colors[0]}'>"
+                         f"<title>{label}: {ok}/{total} OK ({ok / total * 100:.1f}%)</title></rect>")
+        parts.append(f"<text x='{x + bar_w / 2:.2f}' y='{height - 4}' font-size='9' text-anchor='middle' fill='#556070'>{label}</text>")
+    return f"<svg viewBox='0 0 {width} {height}' class='trend' style='width:{width}px;height:{height}px'>{''.join(parts)}</svg>"
+
+def render_trend(conn, out_html, last=12, source=None):
+    import vcf9_cpu_support_report as rpt
+    rows = vendor_trend(conn, last, source)
+    snaps, per_vendor = {}, {}
+    for sid, date, src, vendor, ok, total in rows:
+        s = snaps.setdefault(sid, [date, 0, 0]); s[1] += ok; s[2] += total
+        per_vendor.setdefault(vendor, {})[sid] = (ok, total)
+    order = list(snaps)
+
+    html = ["<!doctype html><html><head><meta charset='utf-8'>",
+            "<title>VCF 9.0 Hardware Compatibility — Readiness Trend</title>",
+            rpt.css_styles(), "</head><body><main class='content'>",
+            "<h1>VCF 9.0 Hardware Compatibility — Readiness Trend</h1>"]
+    if not order:
+        html.append("<p>No inventory snapshots in the history database yet.</p>")
+    else:
+        date, ok, total = snaps[order[-1]]
+        html.append(f"<p>Last {len(order)} inventory snapshot(s){' for ' + source if source else ''}, "
+                    f"{snaps[order[0]][0]} to {date}. Bars show the share of hosts that are OK (blue) vs Blocked (red).</p>")
+        html.append("<h2>All Vendors</h2><div class='kpi'>")
+        html.append(rpt.pie_svg_two(ok, total - ok, size=160))
+        html.append(trend_svg([(snaps[s][0], snaps[s][1], snaps[s][2]) for s in order]))
+        html.append(f"""
+          <div class="legend2" aria-label="Latest snapshot">
+            <div><span class="chip ok"></span> OK: <b>{ok}</b> ({(ok / total * 100 if total else 0):.1f}%)</div>
+            <div><span class="chip blocked"></span> Blocked: <b>{total - ok}</b></div>
+            <div>Latest snapshot: <b>{date}</b></div>
+          </div>
+        """)
+        html.append("</div>")
+        for vendor in sorted(per_vendor):
+            pts = [(snaps[s][0], *per_vendor[vendor].get(s, (0, 0))) for s in order]
+            html.append(f"<div class='vendor-title'>{vendor}</div><div class='kpi'>{trend_svg(pts)}</div>")
+        html.append("<h2>OK % per Vendor</h2><table><thead><tr><th>Vendor</th>"
+                    + "".join(f"<th>{snaps[s][0]}</th>" for s in order) + "</tr></thead><tbody>")
+        for vendor in sorted(per_vendor):
+            cells = []
+            for s in order:
+                ok, total = per_vendor[vendor].get(s, (0, 0))
+                cells.append(f"<td>{ok / total * 100:.1f}%</td>" if total else "<td></td>")
+            html.append(f"<tr><td>{vendor}</td>{''.join(cells)}</tr>")
+        html.append("</tbody></table>")
+    html.append(f"""
+      <div class="footer tiny">Generated: {datetime.now().strftime('%d %B %Y, %H:%M')}</div>
+    """)
+    html.append("</main></body></html>")
+    with open(out_html, "w", encoding="utf-8") as f:
+        f.write("\n".join(html))
+
+# =========================
+# Main
+# =========================
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Query the VCF 9.0 readiness history database.")
+    ap.add_argument("--db", required=True, help="SQLite history database")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("snapshots", help="list stored snapshots")
+    p = sub.add_parser("vendor-trend", help="OK %% per vendor over the last N inventory snapshots")
+    p.add_argument("--last", type=int, default=12); p.add_argument("--source")
+    p = sub.add_parser("cpu-listed", help="when a CPU (optionally on a model) became ESXi 9.0-listed")
+    p.add_argument("cpu"); p.add_argument("--model")
+    p = sub.add_parser("render-trend", help="write an HTML page of trend charts")
+    p.add_argument("--out", required=True); p.add_argument("--last", type=int, default=12); p.add_argument("--source")
+    p = sub.add_parser("ingest-hcl", help="backfill an old HCL export")
+    p.add_argument("path"); p.add_argument("--date", help="snapshot date YYYY-MM-DD (default: today)")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))     # the commands import the report
+    args = parse_args(argv)
+    conn = connect(args.db)
+    if args.cmd == "snapshots":
+        for sid, kind, date, rows, source in list_snapshots(conn):
+            print(f"{sid:>5}  {kind:<9} {date}  {rows:>8}  {source}")
+    elif args.cmd == "vendor-trend":
+        for _, date, source, vendor, ok, total in vendor_trend(conn, args.last, args.source):
+            print(f"{date}  {vendor:<10} {ok:>7}/{total:<7} {ok / total * 100:6.1f}%  {source}")
+    elif args.cmd == "cpu-listed":
+        import vcf9_cpu_support_report as rpt
+        hist = cpu_listing_history(conn, rpt.norm_cpu(args.cpu), rpt.norm_model(args.model) if args.model else None)
+        for date, source, listed, ok in hist:
+            print(f"{date}  listed={listed:<4} esxi9_ok={ok:<4} {source}")
+        first = first_ok_date(hist)
+        print("First ESXi 9.0-listed snapshot:", first or "never (in stored HCL snapshots)")
+    elif args.cmd == "render-trend":
+        render_trend(conn, args.out, args.last, args.source)
+        print("Trend report written to:\n ", args.out)
+    elif args.cmd == "ingest-hcl":
+        import vcf9_cpu_support_report as rpt
+        rpt.DEBUG = False
+        try: data = rpt.build_hcl_dataset(args.path)
+        except rpt.HclError as e: print("[ERROR]", e); sys.exit(1)
+        sid, inserted = ingest_hcl(conn, os.path.abspath(args.path), rpt.file_fingerprint(args.path)["sha256"],
+                                   data["enriched"], rpt.norm_model, rpt.norm_cpu, args.date)
+        print(f"[HISTORY] HCL snapshot {sid}", "ingested" if inserted else "already present")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Host inventory collector for a VCF Operations (suite-api) endpoint.
+
+Pages through the HostSystem resources and their properties over a small pool of
+keep-alive connections, with a bounded number of pages in flight and retry/backoff on
+connection errors, 429 and 5xx. Rows are yielded in page order as plain dicts keyed by the
+same headers as the "Host Inventory" CSV export, so the report treats them like a CSV.
+
+vcf9_cpu_support_report.py uses this when the inventory is an http(s) URL:
+
+    python3 vcf9_cpu_support_report.py --ops https://vcf-ops.example.local
+    python3 vcf9_ops_collector.py https://vcf-ops.example.local --out "Ops Host Inventory.csv"
+
+Credentials come from VCF9_OPS_TOKEN, or VCF9_OPS_USER / VCF9_OPS_PASSWORD (and optionally
+VCF9_OPS_AUTH_SOURCE). Set VCF9_OPS_INSECURE=1 to accept self-signed certificates.
+See vcf9_ops_stub.py for a local server to try it against.
+"""
+
+import os, sys, csv, ssl, json, time, queue, random, argparse, threading, http.client
+from collections import deque
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+API_PREFIX = "/suite-api/api"
+OPS_PAGE_SIZE = 1000
+OPS_WORKERS = 4
+OPS_TIMEOUT = 60
+OPS_RETRIES = 4
+OPS_BACKOFF = 0.5           # seconds, doubled per attempt (plus jitter)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Inventory CSV header -> HostSystem property key ("Name" is the resource name)
+OPS_HOST_PROPERTIES = {
+    "Parent vCenter": "summary|parentVcenter",
+    "Parent Cluster": "summary|parentCluster",
+    "Version":        "summary|version",
+    "Model":          "hardware|vendorModel",
+    "Serial Number":  "hardware|serialNumberTag",
+    "BIOS Version":   "hardware|biosVersion",
+    "CPU Model":      "cpu|cpuModel",
+    "Sockets":        "hardware|cpuInfo|numCpuPackages",
+    "Cores":          "hardware|cpuInfo|numCpuCores",
+    "Memory (GB)":    "hardware|memorySize",           # KB in Operations
+    "Management IP":  "net|mgmt_address",
+}
+OPS_HEADERS = ["Name"] + list(OPS_HOST_PROPERTIES)
+
+class OpsError(Exception):
+    pass
+
+# =========================
+# Connection pool
+# =========================
+class OpsClient:
+    """Thread-safe JSON client holding up to `size` keep-alive connections to one host."""
+
+    def __init__(self, base_url, size=OPS_WORKERS, timeout=OPS_TIMEOUT, retries=OPS_RETRIES,
+                 backoff=OPS_BACKOFF, insecure=None):
+        u = urlsplit(base_url)
+        if u.scheme not in ("http", "https") or not u.hostname:
+            raise OpsError(f"not an http(s) URL: {base_url!r}")
+        self.scheme, self.host, self.port = u.scheme, u.hostname, u.port
+        self.prefix = u.path.rstrip("/") + API_PREFIX
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        if insecure is None: insecure = os.environ.get("VCF9_OPS_INSECURE", "") not in ("", "0")
+        self.ssl_context = ssl._create_unverified_context() if insecure else ssl.create_default_context()
+        self.pool = queue.LifoQueue(maxsize=size)
+        for _ in range(size): self.pool.put(None)   # connections are opened lazily
+        self.headers = {"Accept": "application/json", "Content-Type": "application/json", "Connection": "keep-alive"}
+        self.requests = self.retried = self.connections = 0
+        self.stats_lock = threading.Lock()      # pages are fetched from several threads
+
+    def _tally(self, name):
+        with self.stats_lock: setattr(self, name, getattr(self, name) + 1)
+
+    def _connect(self):
+        self._tally("connections")
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, params=None):
+        url = self.prefix + path + (f"?{urlencode(params)}" if params else "")
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        for attempt in range(self.retries + 1):
+            conn, delay = self.pool.get(), None
+            try:
+                if conn is None: conn = self._connect()
+                self._tally("requests")
+                conn.request(method, url, body=payload, headers=self.headers)
+                resp = conn.getresponse()
+                data = resp.read()                       # always drain so the connection can be reused
+                if resp.getheader("Connection", "").lower() == "close": conn.close(); conn = None
+            except (OSError, http.client.HTTPException) as e:
+                if conn is not None: conn.close(); conn = None
+                error = f"{method} {url}: {type(e).__name__}: {e}"
+            else:
+                if resp.status not in RETRY_STATUSES:
+                    if resp.status >= 400: raise OpsError(f"{method} {url}: HTTP {resp.status} {data[:200]!r}")
+                    try: return json.loads(data) if data else None
+                    except ValueError as e: raise OpsError(f"{method} {url}: invalid JSON in HTTP {resp.status} reply: {e}")
+                error = f"{method} {url}: HTTP {resp.status}"
+                retry_after = resp.getheader("Retry-After")
+                if retry_after and retry_after.isdigit(): delay = float(retry_after)
+            finally:
+                self.pool.put(conn)
+            if attempt >= self.retries: raise OpsError(error)
+            self._tally("retried")
+            time.sleep(delay if delay is not None else self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def authenticate(self):
+        token = os.environ.get("VCF9_OPS_TOKEN")
+        user = os.environ.get("VCF9_OPS_USER")
+        if not token and user:
+            body = {"username": user, "password": os.environ.get("VCF9_OPS_PASSWORD", "")}
+            if os.environ.get("VCF9_OPS_AUTH_SOURCE"): body["authSource"] = os.environ["VCF9_OPS_AUTH_SOURCE"]
+            token = (self.request("POST", "/auth/token/acquire", body) or {}).get("token")
+            if not token: raise OpsError("token acquire returned no token")
+        if token: self.headers["Authorization"] = f"OpsToken {token}"
+
+    def close(self):
+        while not self.pool.empty():
+            conn = self.pool.get_nowait()
+            if conn is not None: conn.close()
+
+# =========================
+# Host inventory
+# =========================
+def _host_row(resource, props):
+    row = {"Name": resource.get("resourceKey", {}).get("name", "")}
+    for header, key in OPS_HOST_PROPERTIES.items():
+        v = props.get(key, "")
+        if header == "Memory (GB)" and v not in ("", None):
+            try: v = f"{float(v) / 1048576:.2f}"
+            except ValueError: pass
+        row[header] = "" if v is None else str(v)
+    return row
+
+def fetch_page(client, page, page_size):
+    """One page of HostSystem resources joined with their properties (two requests)."""
+    listing = client.request("GET", "/resources", params={"resourceKind": "HostSystem", "page": page, "pageSize": page_size})
+    resources = listing.get("resourceList", []) or []
+    ids = [r["identifier"] for r in resources]
+    props = {}
+    if ids:
+        reply = client.request("POST", "/resources/properties", {"resourceIds": ids})
+        for rp in reply.get("resourcePropertiesList", []) or []:
+            props[rp.get("resourceId")] = {p.get("name"): p.get("value") for p in rp.get("property", []) or []}
+    total = (listing.get("pageInfo") or {}).get("totalCount", len(resources))
+    return total, [_host_row(r, props.get(r["identifier"], {})) for r in resources]
+
+def iter_ops_hosts(base_url, page_size=OPS_PAGE_SIZE, workers=OPS_WORKERS, stats=None):
+    """
+    Yield inventory rows (dicts keyed by OPS_HEADERS) in page order. Page 0 gives the total;
+    later pages are fetched by `workers` threads with at most 2*workers pages in flight.
+    """
+    client = OpsClient(base_url, size=workers)
+    try:
+        client.authenticate()
+        total, rows = fetch_page(client, 0, page_size)
+        yield from rows
+        pages = -(-total // page_size) if page_size else 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending, nxt = deque(), 1
+            while nxt < pages or pending:
+                while nxt < pages and len(pending) < 2 * workers:
+                    pending.append(pool.submit(fetch_page, client, nxt, page_size)); nxt += 1
+                _, rows = pending.popleft().result()
+                yield from rows
+    finally:
+        client.close()
+        if stats is not None:
+            stats.update(requests=client.requests, retried=client.retried, connections=client.connections)
+
+def collect_to_csv(base_url, out_csv, page_size=OPS_PAGE_SIZE, workers=OPS_WORKERS):
+    stats, n = {}, 0
+    with open(out_csv, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=OPS_HEADERS)
+        w.writeheader()
+        for row in iter_ops_hosts(base_url, page_size, workers, stats):
+            w.writerow(row); n += 1
+    return n, stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export VCF Operations HostSystem inventory to a Host Inventory CSV.")
+    ap.add_argument("url", help="Operations base URL, e.g. https://vcf-ops.example.local")
+    ap.add_argument("--out", required=True, help="CSV to write")
+    ap.add_argument("--page-size", type=int, default=OPS_PAGE_SIZE)
+    ap.add_argument("--workers", type=int, default=OPS_WORKERS)
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    try:
+        n, stats = collect_to_csv(args.url, args.out, args.page_size, args.workers)
+    except OpsError as e:
+        print("[ERROR] Operations collection failed:", e); sys.exit(1)
+    print(f"[OPS] {n} hosts in {time.perf_counter() - t0:.2f}s "
+          f"({stats['requests']} requests, {stats['retried']} retried, {stats['connections']} connections)")
+    print("Inventory written to:\n ", args.out)
+
+if __name__ == "__main__":
+    main()
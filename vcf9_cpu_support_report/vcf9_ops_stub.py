@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the VCF Operations suite-api, for trying vcf9_ops_collector.py.
+
+Serves the hosts of a Host Inventory CSV as paginated HostSystem resources over HTTP/1.1
+keep-alive, optionally with latency and random 503s to exercise retries:
+
+    python3 vcf9_ops_stub.py --inventory "Sep 2025 Host Inventory.csv" --port 8080 --fail-rate 0.05
+    python3 vcf9_cpu_support_report.py --ops http://127.0.0.1:8080
+
+Endpoints: POST /suite-api/api/auth/token/acquire, GET /suite-api/api/resources
+(resourceKind, page, pageSize) and POST /suite-api/api/resources/properties.
+"""
+
+import os, sys, json, time, random, argparse, threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import vcf9_cpu_support_report as rpt
+from vcf9_ops_collector import API_PREFIX, OPS_HOST_PROPERTIES
+
+STUB_TOKEN = "stub-token"
+
+def load_hosts(inv_csv):
+    """Inventory CSV -> [(identifier, name, {property: value})] in file order."""
+    rows, headers = rpt.stream_csv_robust(inv_csv)
+    if rows is None: raise SystemExit(f"[ERROR] Could not parse {inv_csv}")
+    name_col = rpt.pick_column(headers, ["Name", "Hostname", "Host Name"])
+    cols = {key: rpt.normalise_key(h) for h, key in OPS_HOST_PROPERTIES.items()}
+    hosts = []
+    for i, r in enumerate(rows):
+        props = {key: r[col] for key, col in cols.items() if r.get(col, "") != ""}
+        mem = props.get("hardware|memorySize")
+        if mem:
+            try: props["hardware|memorySize"] = str(round(float(mem) * 1048576))   # GB -> KB
+            except ValueError: del props["hardware|memorySize"]
+        hosts.append((f"host-{i:08d}", r.get(name_col, ""), props))
+    return hosts
+
+class OpsStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive
+    server_version = "vcf9-ops-stub"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose: super().log_message(fmt, *args)
+
+    def _send(self, status, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _preflight(self):
+        srv = self.server
+        with srv.lock: srv.requests += 1
+        if srv.latency: time.sleep(srv.latency)
+        if srv.fail_rate and srv.rng.random() < srv.fail_rate:
+            with srv.lock: srv.failed += 1
+            self._send(503, {"message": "injected failure"}); return False
+        if srv.require_token and self.headers.get("Authorization") != f"OpsToken {STUB_TOKEN}" \
+                and not self.path.startswith(API_PREFIX + "/auth/"):
+            self._send(401, {"message": "missing or invalid OpsToken"}); return False
+        return True
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}") if n else {}
+
+    def do_GET(self):
+        self._body()      # drain any body so the connection stays usable
+        if not self._preflight(): return
+        u = urlsplit(self.path)
+        if u.path != API_PREFIX + "/resources": return self._send(404, {"message": "not found"})
+        q = parse_qs(u.query)
+        hosts = self.server.hosts if q.get("resourceKind", ["HostSystem"])[0] == "HostSystem" else []
+        page, size = int(q.get("page", ["0"])[0]), int(q.get("pageSize", ["1000"])[0])
+        chunk = hosts[page * size:(page + 1) * size]
+        self._send(200, {
+            "pageInfo": {"totalCount": len(hosts), "page": page, "pageSize": size},
+            "resourceList": [{"identifier": ident, "resourceKey": {
+                "name": name, "adapterKindKey": "VMWARE", "resourceKindKey": "HostSystem"}} for ident, name, _ in chunk],
+        })
+
+    def do_POST(self):
+        body = self._body()
+        if not self._preflight(): return
+        path = urlsplit(self.path).path
+        if path == API_PREFIX + "/auth/token/acquire":
+            return self._send(200, {"token": STUB_TOKEN, "validity": int(time.time() * 1000) + 6 * 3600 * 1000})
+        if path != API_PREFIX + "/resources/properties": return self._send(404, {"message": "not found"})
+        props = self.server.props
+        self._send(200, {"resourcePropertiesList": [
+            {"resourceId": ident, "property": [{"name": k, "value": v} for k, v in props[ident].items()]}
+            for ident in body.get("resourceIds", []) if ident in props]})
+
+def make_server(hosts, port=0, fail_rate=0.0, latency=0.0, require_token=False, seed=9, verbose=False):
+    srv = ThreadingHTTPServer(("127.0.0.1", port), OpsStubHandler)
+    srv.daemon_threads = True
+    srv.props = {ident: props for ident, _, props in hosts}
+    srv.hosts, srv.fail_rate, srv.latency, srv.require_token, srv.verbose = hosts, fail_rate, latency, require_token, verbose
+    srv.rng, srv.lock, srv.requests, srv.failed = random.Random(seed), threading.Lock(), 0, 0
+    return srv
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve a Host Inventory CSV as a VCF Operations-style REST API.")
+    ap.add_argument("--inventory", required=True, help="Host Inventory CSV to serve")
+    ap.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    ap.add_argument("--require-token", action="store_true", help="reject requests without the stub OpsToken")
+    ap.add_argument("--verbose", action="store_true", help="log every request")
+    args = ap.parse_args(argv)
+    rpt.DEBUG = False
+    hosts = load_hosts(args.inventory)
+    srv = make_server(hosts, args.port, args.fail_rate, args.latency, args.require_token, verbose=args.verbose)
+    print(f"[STUB] Serving {len(hosts)} hosts on http://127.0.0.1:{srv.server_address[1]}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        print(f"[STUB] {srv.requests} requests, {srv.failed} injected failures")
+
+if __name__ == "__main__":
+    main()